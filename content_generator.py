@@ -9,47 +9,72 @@ Streamlit web application for generating viral content ideas using Gemini AI
 import streamlit as st 
 import json  # Make sure this is imported if not already
 import os
-from typing import Dict, Any, List
-
-# Initialize session state for copy notifications
-if 'copy_status' not in st.session_state:
-    st.session_state.copy_status = {}
-
-def add_copy_script():
-    """Add JavaScript for clipboard functionality"""
-    st.markdown("""
-    <script>
-    function copyToClipboard(elementId, text) {
-        navigator.clipboard.writeText(text).then(function() {
-            console.log('Text copied to clipboard');
-        }).catch(function(err) {
-            console.error('Failed to copy text: ', err);
-        });
-    }
-    </script>
-    """, unsafe_allow_html=True)
+import asyncio
+import importlib.util
+import logging
+import queue
+import random
+import re
+import secrets
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Tuple, Optional
 
-# Try importing the google-generativeai library with enhanced error handling
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError as e:
-    st.error(f"Failed to import google.generativeai: {e}")
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _module_available(name: str) -> bool:
+    """Check whether a module can be imported without actually importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# google-generativeai is heavy to import, so only check it is installed here (see _genai)
+GENAI_AVAILABLE = _module_available("google.generativeai")
+if not GENAI_AVAILABLE:
+    st.error("Failed to import google.generativeai: module not found")
     st.error("Please install: pip install google-generativeai")
-    GENAI_AVAILABLE = False
-    st.stop()
-except Exception as e:
-    st.error(f"Unexpected error importing Gemini AI: {e}")
-    GENAI_AVAILABLE = False
     st.stop()
 
+@st.cache_resource(show_spinner=False)
+def _genai():
+    """Import google.generativeai on first use"""
+    import google.generativeai as genai
+    return genai
+
+# Fast JSON parsing/serialization (optional - falls back to the stdlib json module)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _json_loads(text):
+    """Parse JSON text, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+# Short-lived per-session cache of Gemini responses, so retrying a failed generation reuses what it received
+from prompt_cache import get_cached_response, store_response, discard_response
+
+# Client-side requests/tokens per minute limiter shared by every session using the same key
+from gemini_limiter import TokenBucket, get_rate_limiter, estimate_tokens
+
 # Import database manager for content tracking
 try:
     from db_manager import (
         setup_database, 
         get_current_day, 
         log_idea, 
-        check_for_duplication
+        log_idea_bulk,
+        check_for_duplication,
+        check_for_duplication_bulk
     )
     DB_AVAILABLE = True
 except ImportError as e:
@@ -75,35 +100,40 @@ except ImportError as e:
     st.warning(f"Authentication system not available: {e}")
     AUTH_AVAILABLE = False
 
-# Import team collaboration system
-try:
-    from team_ui import (
-        show_teams_interface,
-        show_create_team_modal,
-        show_join_team_modal,
-        show_team_dashboard,
-        add_team_share_button,
-        initialize_team_system
-    )
-    TEAMS_AVAILABLE = True
-    initialize_team_system()  # Initialize team system
-except ImportError as e:
-    st.warning(f"Team collaboration not available: {e}")
-    TEAMS_AVAILABLE = False
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_user_stats(user_id: str) -> dict:
+    """get_user_stats memoized across reruns; cleared whenever a generation is recorded"""
+    return get_user_stats(user_id)
 
-# Import simple API key management
-try:
-    from simple_api_manager import (
-        ensure_api_key_configured,
-        get_configured_api_key,
-        show_database_access
-    )
-    API_MANAGER_AVAILABLE = True
-except ImportError as e:
-    st.warning(f"API key manager not available: {e}")
-    API_MANAGER_AVAILABLE = False
+def _record_generation_activity(user_id: str, ideas_count: int, niches: str, session_id: str):
+    """Log a generation and drop the memoized stats so the dashboard totals stay current"""
+    log_generation_activity(user_id, ideas_count, niches, session_id)
+    _cached_user_stats.clear()
+
+# Team collaboration UI is imported on first use (see _team_ui)
+TEAMS_AVAILABLE = _module_available("team_ui")
+if not TEAMS_AVAILABLE:
+    st.warning("Team collaboration not available: team_ui module not found")
+
+@st.cache_resource(show_spinner=False)
+def _team_ui():
+    """Import the team collaboration UI on first use and initialize its database once"""
+    import team_ui
+    team_ui.initialize_team_system()
+    return team_ui
+
+# Simple API key management is imported on first use (see _api_manager)
+API_MANAGER_AVAILABLE = _module_available("simple_api_manager")
+if not API_MANAGER_AVAILABLE:
+    st.warning("API key manager not available: simple_api_manager module not found")
+
+@st.cache_resource(show_spinner=False)
+def _api_manager():
+    """Import the simple API key manager on first use"""
+    import simple_api_manager
+    return simple_api_manager
 
-# JSON Schema for structured output - ENHANCED for time slots and detailed Veo 3.1 scripts
+# JSON Schema for structured output (converted to the SDK's Schema proto once, see _generation_config) - ENHANCED for time slots and detailed Veo 3.1 scripts
 JSON_SCHEMA = {
     "type": "array",
     "items": {
@@ -120,6 +150,29 @@ JSON_SCHEMA = {
     }
 }
 
+REQUIRED_IDEA_FIELDS = tuple(JSON_SCHEMA["items"]["required"])
+
+# Compiled validator for a niche's response (optional - falls back to manual field checks)
+try:
+    import msgspec
+    from typing import Annotated
+    
+    NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+    
+    class Idea(msgspec.Struct):
+        """One generated idea, mirroring JSON_SCHEMA"""
+        niche: NonEmptyStr
+        time_slot: NonEmptyStr
+        title: NonEmptyStr
+        caption_hook: NonEmptyStr
+        video_script: NonEmptyStr
+        full_audio_script: NonEmptyStr
+    
+    _IDEAS_DECODER = msgspec.json.Decoder(List[Idea])
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
 # System instruction for Gemini - ENHANCED for same-day time intervals with detailed video + audio
 SYSTEM_INSTRUCTION = """
 You are a Top-Tier Viral Content Strategist with expertise in creating engaging, shareable content 
@@ -141,38 +194,54 @@ CRITICAL REQUIREMENTS:
 6. SYNCHRONIZATION: Ensure video and audio scripts work together seamlessly for complete production.
 7. UNIQUENESS: Avoid any repetition or similarity to previously generated content.
 8. ENGAGEMENT: Focus on maximum viral potential and audience engagement.
-9. QUANTITY: Generate exactly 3 unique ideas per niche for a total of 9 ideas (all for the same day).
+9. QUANTITY: Generate exactly 3 unique ideas for the requested niche, one per time slot (all for the same day).
 """
 
-def create_enhanced_user_prompt(niche_data: Dict[str, int]) -> str:
-    """
-    Create an enhanced user prompt for generating 9 unique ideas with detailed video + audio scripts.
-    Now generates 3 ideas per niche for the SAME DAY at different time intervals.
-    
-    Args:
-        niche_data: Dictionary mapping niche names to their current continuation days
-        
-    Returns:
-        str: Enhanced prompt for same-day time interval content with detailed Veo 3.1 scripts
-    """
-    
-    # Map database niche names to display names
-    niche_mapping = {
-        "MMO": "Make Money Online / Personal Finance",
-        "AI/Tech": "AI/Tech Tutorials", 
-        "Faceless": "Faceless Theme Page"
-    }
+# Database niche keys in display order - each niche is generated by its own concurrent Gemini call
+NICHES = ("MMO", "AI/Tech", "Faceless")
+
+# Map database niche names to display names
+NICHE_DISPLAY_NAMES = MappingProxyType({
+    "MMO": "Make Money Online / Personal Finance",
+    "AI/Tech": "AI/Tech Tutorials", 
+    "Faceless": "Faceless Theme Page"
+})
+
+# Reverse lookup from the schema's display niche back to the database niche
+_DISPLAY_TO_DB = MappingProxyType({display_name: db_niche for db_niche, display_name in NICHE_DISPLAY_NAMES.items()})
+
+# Keyword fallback for niche strings that don't match a display name exactly (checked in order)
+_NICHE_KEYWORDS = (
+    ("Personal Finance", "MMO"),
+    ("Money", "MMO"),
+    ("AI", "AI/Tech"),
+    ("Tech", "AI/Tech"),
+    ("Faceless", "Faceless")
+)
+
+@lru_cache(maxsize=256)
+def _db_niche_for(niche_display: str) -> Optional[str]:
+    """Map a generated idea's niche to its database niche, falling back to keyword matching"""
+    db_niche = _DISPLAY_TO_DB.get(niche_display)
+    if db_niche is not None:
+        return db_niche
     
-    prompt = """
-Generate THREE (3) high-impact, ORIGINAL content ideas for EACH of these three niches, for a total of NINE (9) unique ideas.
+    for keyword, keyword_niche in _NICHE_KEYWORDS:
+        if keyword in niche_display:
+            return keyword_niche
+    return None
 
-IMPORTANT CHANGE: All 3 ideas per niche are for the SAME DAY but different TIME INTERVALS:
+# Prompt skeleton - plain str.format templates so the constant text is built once at import
+_PROMPT_HEADER = """
+Generate THREE (3) high-impact, ORIGINAL content ideas for the niche below.
+
+IMPORTANT CHANGE: All 3 ideas are for the SAME DAY but different TIME INTERVALS:
 - Idea 1: MORNING content (6 AM - 12 PM target audience)
 - Idea 2: EVENING content (5 PM - 9 PM target audience)  
 - Idea 3: NIGHT content (9 PM - 12 AM target audience)
 
 CRITICAL INSTRUCTIONS:
-- Each niche gets 3 ideas for the SAME continuation day, just different posting times
+- All 3 ideas are for the SAME continuation day, just different posting times
 - The 'video_script' field must contain extremely detailed descriptions for Google Veo 3.1
 - Include specific camera angles, lighting, movements, and visual elements
 - The 'full_audio_script' MUST be split into three parts that sync perfectly with video
@@ -182,12 +251,9 @@ CRITICAL INSTRUCTIONS:
 
 """
 
-    for db_niche, display_name in niche_mapping.items():
-        current_day = niche_data.get(db_niche, 0) + 1  # Next day number
-        
-        if db_niche == "MMO":
-            prompt += f"""
-## **{display_name}** - Generate 3 Time-Slot Ideas for Day {current_day}
+_NICHE_PROMPT_TEMPLATES = MappingProxyType({
+    "MMO": """
+## **{display_name}** - Generate 3 Time-Slot Ideas for Day {day}
 
 **Morning Content (6 AM - 12 PM)**: Target busy professionals starting their day
 **Evening Content (5 PM - 9 PM)**: Target people winding down, planning finances  
@@ -208,10 +274,9 @@ CRITICAL INSTRUCTIONS:
 - Shot 2 Audio: Clear step-by-step explanation matching the video's visual complexity
 - Shot 3 Audio: Strong call-to-action appropriate for the time of day
 
-"""
-        elif db_niche == "AI/Tech":
-            prompt += f"""
-## **{display_name}** - Generate 3 Time-Slot Ideas for Day {current_day}
+""",
+    "AI/Tech": """
+## **{display_name}** - Generate 3 Time-Slot Ideas for Day {day}
 
 **Morning Content (6 AM - 12 PM)**: Target tech workers starting their workday
 **Evening Content (5 PM - 9 PM)**: Target tech enthusiasts exploring after work
@@ -232,10 +297,9 @@ CRITICAL INSTRUCTIONS:
 - Shot 2 Audio: Technical explanation with precise terminology and step-by-step guidance
 - Shot 3 Audio: Encouraging conclusion that motivates immediate experimentation
 
-"""
-        elif db_niche == "Faceless":
-            prompt += f"""
-## **{display_name}** - Generate 3 Time-Slot Ideas for Day {current_day}
+""",
+    "Faceless": """
+## **{display_name}** - Generate 3 Time-Slot Ideas for Day {day}
 
 **Morning Content (6 AM - 12 PM)**: Target people seeking morning motivation and productivity
 **Evening Content (5 PM - 9 PM)**: Target professionals reflecting on their day and goals
@@ -257,12 +321,15 @@ CRITICAL INSTRUCTIONS:
 - Shot 3 Audio: Empowering conclusion that motivates action appropriate for the time
 
 """
-    
-    prompt += f"""
+})
+
+_PROMPT_FOOTER = """
 
 ## OUTPUT REQUIREMENTS:
 
-For each of the 9 ideas (3 per niche, same day, different times), provide:
+For each of the 3 ideas (same day, different times), provide:
+- **Niche**: Exactly "{display_name}"
+- **Time Slot**: Morning, Evening or Night
 - **Title**: A catchy title/hook (max 60 characters) - MUST be completely original
 - **Caption Hook**: An engaging caption hook (max 150 characters) for the specific time slot
 - **Video Script**: An extremely detailed 3-shot video script optimized for Google Veo 3.1
@@ -293,77 +360,490 @@ Make sure each piece of content is:
 4. Designed for maximum viral potential with detailed Veo 3.1 compatibility
 5. Includes professional narration optimized for Google TTS conversion
 
-GENERATE EXACTLY 9 IDEAS TOTAL (3 per niche for the same day, different time slots).
+GENERATE EXACTLY 3 IDEAS TOTAL (one per time slot, all for the same day).
 """
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def create_enhanced_user_prompt(db_niche: str, current_day: int) -> str:
+    """
+    Create an enhanced user prompt for generating 3 unique ideas for a single niche
+    with detailed video + audio scripts, one for each time interval of the SAME DAY.
+    Memoized per (niche, day) so unchanged continuation days reuse the built prompt.
+    
+    Args:
+        db_niche: Database niche name ("MMO", "AI/Tech" or "Faceless")
+        current_day: Current continuation day of the niche
+        
+    Returns:
+        str: Enhanced prompt for same-day time interval content with detailed Veo 3.1 scripts
+    """
+    display_name = NICHE_DISPLAY_NAMES[db_niche]
     
-    return prompt
+    return "".join([
+        _PROMPT_HEADER,
+        _NICHE_PROMPT_TEMPLATES[db_niche].format(display_name=display_name, day=current_day + 1),  # Next day number
+        _PROMPT_FOOTER.format(display_name=display_name)
+    ])
 
 
-def initialize_gemini_client():
+# Same acceptance rule as before the format check was shared: "AIza" prefix and more than 35 characters
+API_KEY_PREFIX = 'AIza'
+API_KEY_MIN_LENGTH = 36
+
+
+def _is_valid_api_key_format(api_key: str) -> bool:
+    """Cheap format check of a Gemini API key (the API itself is the real validation)"""
+    return api_key.startswith(API_KEY_PREFIX) and len(api_key) >= API_KEY_MIN_LENGTH
+
+
+def get_gemini_api_key() -> str:
     """
-    Initialize the Gemini client using the API key from various sources.
+    Get the Gemini API key from the session, the API manager or the environment and validate its format.
     
     Returns:
-        genai.GenerativeModel: Configured Gemini model instance
+        str: The Gemini API key
         
     Raises:
-        ValueError: If no API key is available
-        Exception: If there's an error initializing the client
+        ValueError: If no API key is available or its format is invalid
     """
-    try:
-        # Get API key from the improved API manager or environment
+    # The key entered in this session's sidebar first, then the API manager or environment
+    api_key = st.session_state.get('gemini_api_key')
+    if not api_key:
         if API_MANAGER_AVAILABLE:
-            api_key = get_configured_api_key()
+            api_key = _api_manager().get_configured_api_key()
         else:
             api_key = os.getenv('GEMINI_API_KEY')
+    
+    if not api_key:
+        st.error("⚠️ No Gemini API key found.")
+        st.info("Please configure your API key using the sidebar or set GEMINI_API_KEY environment variable.")
+        if API_MANAGER_AVAILABLE:
+            st.info("👈 Use the sidebar to set up your API key for easy access!")
+        raise ValueError("No Gemini API key available")
+    
+    # Validate API key format
+    if not _is_valid_api_key_format(api_key):
+        st.error("⚠️ Invalid Gemini API key format.")
+        st.info("Please check your API key format. It should start with 'AIza' and be at least 36 characters long.")
+        raise ValueError("Invalid API key format")
+    
+    return api_key
+
+
+def _has_api_key() -> bool:
+    """Whether this session entered a key or the deployment provides one in the environment"""
+    return bool(st.session_state.get('gemini_api_key') or os.getenv('GEMINI_API_KEY'))
+
+
+@contextmanager
+def _step(label: str):
+    """Report a failed setup step once in the UI and re-raise it with the step name"""
+    try:
+        yield
+    except Exception as e:
+        st.error(f"Failed to {label}: {e}")
+        raise Exception(f"Error trying to {label}: {e}") from e
+
+
+@st.cache_resource(show_spinner=False)
+def _gemini_loop() -> asyncio.AbstractEventLoop:
+    """
+    Process-wide event loop, running in a background thread, for every async Gemini call.
+    Each cached model holds a grpc-asyncio client that stays bound to the loop it was created on,
+    so the clients are built on this loop and every run shares it; it is never closed.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gemini-loop", daemon=True).start()
+    return loop
+
+
+# Sentinel telling a missing SDK attribute apart from one that is set to None
+_MISSING = object()
+
+
+async def _new_async_client(api_key: str):
+    """Create a Gemini async client that sends its own API key (built on the loop that will use it)"""
+    from google.ai import generativelanguage as glm
+    return glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+
+
+@st.cache_resource(ttl=3600, max_entries=50, show_spinner=False)
+def initialize_gemini_client(api_key: str):
+    """
+    Initialize the Gemini client for the given API key.
+    Cached per API key so reruns reuse the configured model instead of rebuilding it;
+    entries expire after an hour and at most 50 keys are kept so stale keys don't pile up.
+    The key is bound to the model's own client rather than set with genai.configure, which is
+    process-wide and would let one session's calls go out with another session's key.
+    
+    Args:
+        api_key: Validated Gemini API key (also the cache key)
         
-        if not api_key:
-            st.error("⚠️ No Gemini API key found.")
-            st.info("Please configure your API key using the sidebar or set GEMINI_API_KEY environment variable.")
-            if API_MANAGER_AVAILABLE:
-                st.info("👈 Use the sidebar to set up your API key for easy access!")
-            raise ValueError("No Gemini API key available")
+    Returns:
+        genai.GenerativeModel: Configured Gemini model instance
         
-        # Validate API key format
-        if not api_key.startswith('AIza') or len(api_key) < 35:
-            st.error("⚠️ Invalid Gemini API key format.")
-            st.info("Please check your API key format. It should start with 'AIza' and be at least 36 characters long.")
-            raise ValueError("Invalid API key format")
+    Raises:
+        Exception: If there's an error initializing the client
+    """
+    with _step("configure Gemini API"):
+        async_client = asyncio.run_coroutine_threadsafe(_new_async_client(api_key), _gemini_loop()).result()
+    
+    # Initialize the model with system instruction
+    with _step("initialize Gemini model"):
+        model = _genai().GenerativeModel(
+            model_name="gemini-2.0-flash-exp",
+            system_instruction=SYSTEM_INSTRUCTION
+        )
+        # generate_content_async only falls back to the globally configured client when this is unset.
+        # The attribute is SDK-private (requirements.txt pins the versions that have it), so refuse to
+        # run rather than silently sending this session's calls with another session's key.
+        if getattr(model, '_async_client', _MISSING) is not None:
+            raise RuntimeError(
+                "This google-generativeai version has no GenerativeModel._async_client; "
+                "install a version allowed by requirements.txt"
+            )
+        model._async_client = async_client
+        return model
+
+
+# Decoder used to pull complete idea objects out of a partially streamed JSON array
+_STREAM_DECODER = json.JSONDecoder()
+
+
+def _extract_streamed_ideas(buffer: str, position: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Decode every idea object that has been fully received in a streamed JSON array.
+    
+    Args:
+        buffer: JSON text received so far
+        position: Offset to resume scanning from (returned by the previous call)
         
-        # Configure the Gemini client with error handling
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: Newly completed ideas and the offset to resume from
+    """
+    ideas = []
+    while True:
+        start = buffer.find('{', position)
+        if start == -1:
+            return ideas, position
         try:
-            genai.configure(api_key=api_key)
-            st.success("🔗 Gemini API configured successfully")
-        except Exception as config_error:
-            st.error(f"Failed to configure Gemini API: {config_error}")
-            raise Exception(f"Error configuring Gemini API: {config_error}")
+            idea, end = _STREAM_DECODER.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            # The object is still streaming in - retry once more text arrives
+            return ideas, start
+        ideas.append(idea)
+        position = end
+
+
+# Output budget of one niche call (3 detailed video scripts)
+MAX_OUTPUT_TOKENS = 2048
+
+# Retry policy for a single niche's Gemini call
+MAX_GENERATION_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 1.0
+MAX_RETRY_DELAY_SECONDS = 60.0
+
+# Upper bound on in-flight Gemini calls per generation (one per niche keeps the 3 calls parallel)
+MAX_CONCURRENT_GEMINI_CALLS = 3
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Safety blocks and API key/permission problems will fail again, everything else may be transient"""
+    error_msg = str(error).lower()
+    return not any(marker in error_msg for marker in ("safety", "api key", "api_key", "permission"))
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Check whether the API rejected a call for exceeding its rate limits (HTTP 429)"""
+    error_msg = str(error).lower()
+    return any(marker in error_msg for marker in ("429", "resource exhausted", "resource_exhausted", "rate limit", "quota"))
+
+
+@st.cache_resource(show_spinner=False)
+def _generation_config():
+    """
+    Build the generation config once, with JSON_SCHEMA converted to the SDK's Schema proto
+    so the schema dict is not re-parsed on every generate call.
+    """
+    protos = _genai().protos
+    item_schema = JSON_SCHEMA["items"]
+    
+    response_schema = protos.Schema(
+        type=protos.Type.ARRAY,
+        items=protos.Schema(
+            type=protos.Type.OBJECT,
+            properties={
+                name: protos.Schema(type=protos.Type.STRING, description=field["description"])
+                for name, field in item_schema["properties"].items()
+            },
+            required=list(item_schema["required"])
+        )
+    )
+    
+    return _genai().GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        temperature=0.9,  # High creativity for originality across the 3 ideas
+        max_output_tokens=MAX_OUTPUT_TOKENS
+    )
+
+
+async def _stream_niche_response(model, db_niche: str, prompt: str, on_stream) -> str:
+    """Stream one Gemini response for a niche and return its raw JSON text"""
+    response = await model.generate_content_async(
+        prompt,
+        stream=True,
+        generation_config=_generation_config()
+    )
+    
+    buffer = ""
+    position = 0
+    async for chunk in response:
+        if not chunk.parts:
+            continue
+        buffer += chunk.text
+        streamed_ideas, position = _extract_streamed_ideas(buffer, position)
+        on_stream(db_niche, streamed_ideas, len(buffer))
+    
+    # Validate response
+    if not buffer:
+        raise Exception(f"Empty response received from Gemini API for {db_niche}")
+    
+    return buffer
+
+
+async def _generate_niche_ideas(model, db_niche: str, prompt: str, on_stream, concurrency: asyncio.Semaphore,
+                               rate_limiter: TokenBucket, cache_scope: str) -> Tuple[str, str]:
+    """
+    Stream the 3 time-slot ideas of a single niche from the async Gemini API.
+    Each call waits for room in the API key's rate window; transient failures are retried
+    with jittered exponential backoff (1s, 2s, ...) and 429s also slow the limiter down.
+    
+    Args:
+        model: Configured Gemini model instance
+        db_niche: Database niche name the prompt was built for
+        prompt: Niche-specific user prompt
+        on_stream: Callback receiving the niche, newly completed ideas and characters received, per chunk
+        concurrency: Semaphore bounding concurrent Gemini calls (not held during backoff sleeps)
+        rate_limiter: Requests/tokens per minute limiter of the API key
+        cache_scope: Browser session the response cache is scoped to
         
-        # Initialize the model with system instruction
-        try:
-            model = genai.GenerativeModel(
-                model_name="gemini-2.0-flash-exp",
-                system_instruction=SYSTEM_INSTRUCTION
-            )
-            return model
-        except Exception as model_error:
-            st.error(f"Failed to initialize Gemini model: {model_error}")
-            raise Exception(f"Error initializing Gemini model: {model_error}")
+    Returns:
+        Tuple[str, str]: The niche name and the raw JSON text of its ideas
         
-    except ValueError as ve:
-        st.error(f"Configuration error: {ve}")
-        raise ve
+    Raises:
+        Exception: The last error once all attempts have failed
+    """
+    # Reuse a response this session received moments ago but whose ideas were never delivered
+    cached_text = get_cached_response(cache_scope, prompt)
+    if cached_text is not None:
+        on_stream(db_niche, _extract_streamed_ideas(cached_text, 0)[0], len(cached_text))
+        return db_niche, cached_text
+    
+    estimated_tokens = estimate_tokens(prompt, MAX_OUTPUT_TOKENS)
+    
+    for attempt in range(1, MAX_GENERATION_ATTEMPTS + 1):
+        try:
+            await rate_limiter.acquire(estimated_tokens)
+            async with concurrency:
+                response_text = await _stream_niche_response(model, db_niche, prompt, on_stream)
+            rate_limiter.on_success()
+            break
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                rate_limiter.on_rate_limited()
+            if attempt == MAX_GENERATION_ATTEMPTS or not _is_retryable_error(e):
+                raise
+            delay = min(RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1), MAX_RETRY_DELAY_SECONDS)
+            await asyncio.sleep(delay + random.uniform(0, RETRY_BASE_DELAY_SECONDS))
+    
+    store_response(cache_scope, prompt, response_text)
+    return db_niche, response_text
+
+
+async def _generate_niche_or_error(model, db_niche: str, prompt: str, on_stream, concurrency: asyncio.Semaphore,
+                                   rate_limiter: TokenBucket, cache_scope: str) -> Tuple[str, Any]:
+    """Run a niche generation, returning the error instead of raising so other niches keep going"""
+    try:
+        return await _generate_niche_ideas(model, db_niche, prompt, on_stream, concurrency, rate_limiter, cache_scope)
     except Exception as e:
-        st.error(f"Unexpected error during initialization: {e}")
-        raise Exception(f"Error initializing Gemini client: {e}")
+        return db_niche, e
 
 
-def generate_content_ideas(model):
+async def _generate_all_niches(model, prompts: Dict[str, str], on_stream, on_niche_done, rate_limiter: TokenBucket,
+                               cache_scope: str) -> Tuple[Dict[str, str], Dict[str, Exception]]:
     """
-    Generate 9 content ideas (3 per niche) using the Gemini model with database integration.
+    Run the per-niche generations concurrently and report each one as soon as it completes.
+    A failing niche does not discard the results of the others.
+    
+    Args:
+        model: Configured Gemini model instance
+        prompts: Dictionary mapping niche names to their prompts
+        on_stream: Callback receiving the niche, newly completed ideas and characters received, per chunk
+        on_niche_done: Callback receiving the finished niche and the number of completed niches
+        rate_limiter: Requests/tokens per minute limiter of the API key
+        cache_scope: Browser session the response cache is scoped to
+        
+    Returns:
+        Tuple[Dict[str, str], Dict[str, Exception]]: Raw JSON responses and errors, keyed by niche
+        
+    Raises:
+        Exception: The first error if every niche failed
+    """
+    # Created per run so the limit applies to this generation's calls only
+    concurrency = asyncio.Semaphore(MAX_CONCURRENT_GEMINI_CALLS)
+    pending = [
+        _generate_niche_or_error(model, db_niche, prompt, on_stream, concurrency, rate_limiter, cache_scope)
+        for db_niche, prompt in prompts.items()
+    ]
+    responses = {}
+    failures = {}
+    
+    for next_done in asyncio.as_completed(pending):
+        db_niche, result = await next_done
+        if isinstance(result, Exception):
+            failures[db_niche] = result
+            continue
+        responses[db_niche] = result
+        on_niche_done(db_niche, len(responses))
+    
+    if not responses:
+        raise next(iter(failures.values()))
+    
+    return responses, failures
+
+
+def _run_generation(model, prompts: Dict[str, str], on_stream, on_niche_done, rate_limiter: TokenBucket,
+                    cache_scope: str) -> Tuple[Dict[str, str], Dict[str, Exception]]:
+    """
+    Run _generate_all_niches on the shared Gemini loop and wait for it in the script thread.
+    Progress callbacks are queued by the loop and replayed here, since Streamlit elements
+    can only be updated from the session's own script thread.
+    """
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        _generate_all_niches(
+            model, prompts,
+            lambda *args: events.put((on_stream, args)),
+            lambda *args: events.put((on_niche_done, args)),
+            rate_limiter,
+            cache_scope
+        ),
+        _gemini_loop()
+    )
+    
+    try:
+        while not (future.done() and events.empty()):
+            try:
+                callback, args = events.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            callback(*args)
+        return future.result()
+    finally:
+        future.cancel()  # No-op once finished; stops the calls if the script run is interrupted
+
+
+@st.cache_resource(show_spinner=False)
+def _db_executor() -> ThreadPoolExecutor:
+    """Single background writer for idea and activity logging (one thread avoids SQLite lock contention)"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="idea-log")
+
+
+def _log_batch(candidates: List[Tuple[str, str]], niche_data: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Check and log a generation's ideas in the background thread.
+    Runs outside the Streamlit script, so it only returns a summary instead of rendering anything.
+    
+    Args:
+        candidates: (title, db_niche) pairs in generation order
+        niche_data: Current continuation day of each niche before this generation
+        
+    Returns:
+        Dict[str, Any]: Logged day labels, duplicate titles and error messages
+    """
+    result = {"logged": [], "duplicates": [], "errors": []}
+    
+    # Track day counters for each niche during this session
+    session_counters = {
+        "MMO": niche_data.get("MMO", 0),
+        "AI/Tech": niche_data.get("AI/Tech", 0),
+        "Faceless": niche_data.get("Faceless", 0)
+    }
+    
+    try:
+        # One query for every title instead of one per idea
+        duplicates = check_for_duplication_bulk([title for title, _ in candidates])
+        
+        pending_logs = []
+        seen_titles = set()
+        for title, db_niche in candidates:
+            # Duplicates of stored titles, or of a title earlier in this same batch
+            title_key = title.lower()
+            if title in duplicates or title_key in seen_titles:
+                result["duplicates"].append(title)
+                continue
+            seen_titles.add(title_key)
+            
+            # Increment the session counter for this niche
+            session_counters[db_niche] += 1
+            pending_logs.append((title, db_niche, session_counters[db_niche]))
+        
+        # Insert the whole generation in a single transaction
+        if pending_logs:
+            if log_idea_bulk(pending_logs):
+                result["logged"] = [f"{db_niche} Day {day}" for _, db_niche, day in pending_logs]
+            else:
+                result["errors"].append(f"Failed to log {len(pending_logs)} ideas")
+    except Exception as db_op_error:
+        result["errors"].append(f"Database operation error while logging ideas: {db_op_error}")
+    
+    return result
+
+
+def _prompt_cache_scope() -> str:
+    """Per-browser-session key for the response cache, so other users never receive this session's ideas"""
+    if '_prompt_cache_scope' not in st.session_state:
+        st.session_state._prompt_cache_scope = secrets.token_hex(16)
+    return st.session_state._prompt_cache_scope
+
+
+def _wait_for_pending_log():
+    """Block until the previous generation's background logging is done, so day counters are current"""
+    pending = st.session_state.get('pending_idea_log')
+    if pending is not None:
+        pending.result()
+
+
+def show_idea_log_result():
+    """
+    Report the background logging of the latest generation.
+    Called after the ideas are rendered, so by then the write has normally already finished.
+    """
+    pending = st.session_state.pop('pending_idea_log', None)
+    if pending is None:
+        return
+    
+    result = pending.result()
+    
+    # Report database logging results
+    for title in result["duplicates"]:
+        st.warning(f"⚠️ Potential duplicate detected: {title[:50]}...")
+    if result["logged"]:
+        st.success(f"✅ Successfully logged {len(result['logged'])} new ideas: {', '.join(result['logged'])}")
+    if result["duplicates"]:
+        st.warning(f"⚠️ {len(result['duplicates'])} potential duplicate(s) detected")
+    for message in result["errors"]:
+        st.warning(f"⚠️ {message}")
+
+
+def generate_content_ideas(model, rate_limiter: TokenBucket):
+    """
+    Generate 9 content ideas (3 per niche) using one concurrent Gemini call per niche with database integration.
     Enhanced with comprehensive error handling and validation.
     
     Args:
         model: Configured Gemini model instance
+        rate_limiter: Requests/tokens per minute limiter of the API key
         
     Returns:
         List[Dict[str, Any]]: List of 9 content ideas with video scripts in JSON format
@@ -371,21 +851,15 @@ def generate_content_ideas(model):
     Raises:
         Exception: If there's an error generating content or parsing the response
     """
-    progress_bar = st.progress(0)
-    status_container = st.container()
+    # A single in-place status box instead of a progress bar plus a stack of info messages
+    status = st.status("🔄 Starting content generation process...", expanded=False)
     
     try:
-        with status_container:
-            st.info("🔄 Starting content generation process...")
-            progress_bar.progress(10)
-        
         # Initialize database if available
         if DB_AVAILABLE:
             try:
                 setup_database()
-                with status_container:
-                    st.info("📊 Database initialized - tracking content progression...")
-                progress_bar.progress(20)
+                status.update(label="📊 Database initialized - tracking content progression...")
             except Exception as db_error:
                 st.warning(f"Database setup error: {db_error}")
                 st.info("Continuing without database tracking...")
@@ -394,15 +868,14 @@ def generate_content_ideas(model):
         niche_data = {}
         if DB_AVAILABLE:
             try:
+                _wait_for_pending_log()
                 niche_data = {
                     "MMO": get_current_day("MMO"),
                     "AI/Tech": get_current_day("AI/Tech"), 
                     "Faceless": get_current_day("Faceless")
                 }
                 
-                with status_container:
-                    st.info(f"📈 Generating 3 ideas per niche: MMO (Days {niche_data['MMO'] + 1}-{niche_data['MMO'] + 3}), AI/Tech (Days {niche_data['AI/Tech'] + 1}-{niche_data['AI/Tech'] + 3}), Faceless (Days {niche_data['Faceless'] + 1}-{niche_data['Faceless'] + 3})")
-                progress_bar.progress(30)
+                status.update(label=f"📈 Generating 3 ideas per niche: MMO (Days {niche_data['MMO'] + 1}-{niche_data['MMO'] + 3}), AI/Tech (Days {niche_data['AI/Tech'] + 1}-{niche_data['AI/Tech'] + 3}), Faceless (Days {niche_data['Faceless'] + 1}-{niche_data['Faceless'] + 3})")
                 
             except Exception as e:
                 st.warning(f"Could not retrieve continuation days: {e}")
@@ -410,34 +883,43 @@ def generate_content_ideas(model):
         else:
             niche_data = {"MMO": 0, "AI/Tech": 0, "Faceless": 0}
         
-        # Create enhanced prompt with continuation day information for 9 ideas
+        # Create one enhanced prompt per niche with its continuation day information
         try:
-            enhanced_prompt = create_enhanced_user_prompt(niche_data)
-            progress_bar.progress(40)
+            prompts = {
+                db_niche: create_enhanced_user_prompt(db_niche, niche_data.get(db_niche, 0))
+                for db_niche in NICHES
+            }
         except Exception as prompt_error:
             st.error(f"Error creating prompt: {prompt_error}")
             raise Exception(f"Failed to create generation prompt: {prompt_error}")
         
-        with status_container:
-            st.info("🎬 Generating 9 unique ideas with detailed video scripts for Veo 3 compatibility...")
-        progress_bar.progress(50)
+        status.update(label="🎬 Generating 9 unique ideas with detailed video scripts for Veo 3 compatibility...")
+        
+        # One in-place placeholder per niche showing stream progress and each idea as soon as it is complete
+        preview_slots = {db_niche: st.empty() for db_niche in NICHES}
+        streamed_titles = {db_niche: {} for db_niche in NICHES}
         
-        # Generate content with structured output - enhanced error handling
+        def show_stream_progress(db_niche: str, new_ideas: List[Dict[str, Any]], received_chars: int):
+            # Keyed by time slot so a retried niche replaces its earlier partial preview
+            for idea in new_ideas:
+                time_slot = idea.get('time_slot', '')
+                streamed_titles[db_niche][time_slot] = f"- 💡 {time_slot}: {idea.get('title', '')}"
+            preview_slots[db_niche].markdown(
+                f"**{db_niche}** · ✍️ {received_chars / 1024:.1f} KB received\n" + "\n".join(streamed_titles[db_niche].values())
+            )
+        
+        def report_niche_done(db_niche: str, completed: int):
+            status.update(label=f"✅ {db_niche} ideas received ({completed}/{len(prompts)})")
+        
+        # Stream all niches concurrently with structured output - enhanced error handling
+        cache_scope = _prompt_cache_scope()
         try:
-            response = model.generate_content(
-                enhanced_prompt,
-                generation_config=genai.GenerationConfig(
-                    response_mime_type="application/json",
-                    response_schema=JSON_SCHEMA,
-                    temperature=0.9,  # High creativity for originality across 9 ideas
-                    max_output_tokens=6144  # Increased significantly for 9 detailed video scripts
-                )
+            responses, failures = _run_generation(
+                model, prompts, show_stream_progress, report_niche_done, rate_limiter, cache_scope
             )
-            progress_bar.progress(70)
             
-            # Validate response
-            if not response or not response.text:
-                raise Exception("Empty response received from Gemini API")
+            for db_niche, niche_error in failures.items():
+                st.warning(f"⚠️ {db_niche} ideas could not be generated: {niche_error}")
                 
         except Exception as api_error:
             error_msg = str(api_error)
@@ -452,53 +934,68 @@ def generate_content_ideas(model):
                 st.error(f"🚫 API Error: {error_msg}")
             
             raise Exception(f"Failed to generate content: {api_error}")
+        finally:
+            for slot in preview_slots.values():
+                slot.empty()
         
-        # Parse the JSON response with validation
+        # Parse each niche's JSON response with validation and merge them in display order
         try:
-            content_ideas = json.loads(response.text)
-            progress_bar.progress(80)
-            
-            # Validate response structure
-            if not isinstance(content_ideas, list):
-                raise ValueError("Response is not a list of ideas")
-            
-            # Validate each idea has required fields
-            for i, idea in enumerate(content_ideas):
-                required_fields = ['title', 'niche', 'time_slot', 'caption_hook', 'video_script', 'full_audio_script']
-                missing_fields = [field for field in required_fields if field not in idea or not idea[field]]
+            content_ideas = []
+            for db_niche in NICHES:
+                if db_niche not in responses:
+                    continue
+                response_text = responses[db_niche]
+                
+                if MSGSPEC_AVAILABLE:
+                    try:
+                        # Decode and validate the whole array against the Idea struct in one call
+                        content_ideas.extend(msgspec.to_builtins(_IDEAS_DECODER.decode(response_text)))
+                        continue
+                    except msgspec.ValidationError as validation_error:
+                        st.warning(f"⚠️ {db_niche} ideas failed validation: {validation_error}")
+                    except msgspec.DecodeError:
+                        pass  # Malformed JSON - the parser below reports it
+                
+                # Lenient parsing keeps the niche's ideas even when some fields are missing
+                niche_ideas = _json_loads(response_text)
                 
-                if missing_fields:
-                    st.warning(f"⚠️ Idea {i+1} missing fields: {', '.join(missing_fields)}")
+                # Validate response structure
+                if not isinstance(niche_ideas, list):
+                    raise ValueError(f"{db_niche} response is not a list of ideas")
+                
+                # Validate each idea has required fields
+                for i, idea in enumerate(niche_ideas):
+                    missing_fields = [field for field in REQUIRED_IDEA_FIELDS if field not in idea or not idea[field]]
+                    
+                    if missing_fields:
+                        st.warning(f"⚠️ {db_niche} idea {i+1} missing fields: {', '.join(missing_fields)}")
+                
+                content_ideas.extend(niche_ideas)
                     
         except json.JSONDecodeError as json_error:
+            discard_response(cache_scope, prompts[db_niche])  # Don't serve the broken response to a retry
             st.error(f"🚫 Failed to parse AI response as JSON: {json_error}")
-            st.code(response.text[:500] + "..." if len(response.text) > 500 else response.text)
+            st.code(response_text[:500] + "..." if len(response_text) > 500 else response_text)
             raise Exception(f"Invalid JSON response: {json_error}")
         except Exception as parse_error:
+            discard_response(cache_scope, prompts[db_niche])
             st.error(f"🚫 Error validating response: {parse_error}")
             raise Exception(f"Response validation failed: {parse_error}")
         
+        # These ideas are delivered now - clicking Generate again must ask Gemini for new ones
+        for db_niche in responses:
+            discard_response(cache_scope, prompts[db_niche])
+        
         # Validate we got the expected number of ideas
         if len(content_ideas) != 9:
             st.warning(f"Expected 9 ideas, got {len(content_ideas)}. Proceeding with available ideas.")
         elif len(content_ideas) == 0:
             raise Exception("No content ideas were generated")
         
-        progress_bar.progress(90)
-        
         # Validate and log ideas to database if available
         if DB_AVAILABLE:
-            logged_ideas = []
-            duplicate_count = 0
-            db_errors = 0
-            
-            # Track day counters for each niche during this session
-            session_counters = {
-                "MMO": niche_data.get("MMO", 0),
-                "AI/Tech": niche_data.get("AI/Tech", 0),
-                "Faceless": niche_data.get("Faceless", 0)
-            }
-            
+            # Map every idea to its database niche first, then check and log them as one batch
+            candidates = []
             for i, idea in enumerate(content_ideas, 1):
                 try:
                     title = idea.get('title', '')
@@ -510,168 +1007,31 @@ def generate_content_ideas(model):
                         continue
                     
                     # Map display niche back to database niche
-                    db_niche = None
-                    if "Personal Finance" in niche_display or "Money" in niche_display:
-                        db_niche = "MMO"
-                    elif "AI" in niche_display or "Tech" in niche_display:
-                        db_niche = "AI/Tech"
-                    elif "Faceless" in niche_display:
-                        db_niche = "Faceless"
-                    
-                    if db_niche and title:
-                        # Check for duplication with error handling
-                        try:
-                            is_duplicate = check_for_duplication(title)
-                            if not is_duplicate:
-                                # Increment the session counter for this niche
-                                session_counters[db_niche] += 1
-                                next_day = session_counters[db_niche]
-                                
-                                if log_idea(title, db_niche, next_day):
-                                    logged_ideas.append(f"{db_niche} Day {next_day}")
-                                else:
-                                    db_errors += 1
-                            else:
-                                duplicate_count += 1
-                                st.warning(f"⚠️ Potential duplicate detected: {title[:50]}...")
-                        except Exception as db_op_error:
-                            st.warning(f"Database operation error for idea {i}: {db_op_error}")
-                            db_errors += 1
+                    db_niche = _db_niche_for(niche_display)
+                    if db_niche:
+                        candidates.append((title.strip(), db_niche))
                             
                 except Exception as e:
                     st.error(f"Error processing idea {i}: {e}")
-                    db_errors += 1
             
-            # Report database logging results
-            if logged_ideas:
-                st.success(f"✅ Successfully logged {len(logged_ideas)} new ideas: {', '.join(logged_ideas)}")
-            if duplicate_count > 0:
-                st.warning(f"⚠️ {duplicate_count} potential duplicate(s) detected")
-            if db_errors > 0:
-                st.warning(f"⚠️ {db_errors} database error(s) occurred during logging")
+            # Duplicate checks and inserts run in the background; results are shown with the ideas
+            if candidates:
+                st.session_state.pending_idea_log = _db_executor().submit(_log_batch, candidates, niche_data)
         
-        progress_bar.progress(100)
-        with status_container:
-            st.success(f"🎬 Generated {len(content_ideas)} ideas with detailed video scripts!")
+        status.update(label=f"🎬 Generated {len(content_ideas)} ideas with detailed video scripts!", state="complete")
         
         return content_ideas
         
     except Exception as e:
-        progress_bar.progress(100)  # Complete the progress bar even on error
-        with status_container:
-            st.error(f"🚫 Content generation failed: {e}")
+        status.update(label=f"🚫 Content generation failed: {e}", state="error")
         
-        # Log the error for debugging
-        import traceback
-        st.error("Full error details:")
-        st.code(traceback.format_exc())
+        # Log the error for debugging; only ship the traceback to the browser in debug mode
+        logger.exception("Content generation failed")
+        if st.session_state.get("debug_mode", False):
+            st.error("Full error details:")
+            st.code(traceback.format_exc())
         
         raise e
-    try:
-        # Initialize database if available
-        if DB_AVAILABLE:
-            setup_database()
-            st.info("📊 Database initialized - tracking content progression...")
-        
-        # Get current continuation days for each niche
-        niche_data = {}
-        if DB_AVAILABLE:
-            try:
-                niche_data = {
-                    "MMO": get_current_day("MMO"),
-                    "AI/Tech": get_current_day("AI/Tech"), 
-                    "Faceless": get_current_day("Faceless")
-                }
-                
-                st.info(f"📈 Generating 3 ideas per niche: MMO (Days {niche_data['MMO'] + 1}-{niche_data['MMO'] + 3}), AI/Tech (Days {niche_data['AI/Tech'] + 1}-{niche_data['AI/Tech'] + 3}), Faceless (Days {niche_data['Faceless'] + 1}-{niche_data['Faceless'] + 3})")
-                
-            except Exception as e:
-                st.warning(f"Could not retrieve continuation days: {e}")
-                niche_data = {"MMO": 0, "AI/Tech": 0, "Faceless": 0}
-        else:
-            niche_data = {"MMO": 0, "AI/Tech": 0, "Faceless": 0}
-        
-        # Create enhanced prompt with continuation day information for 9 ideas
-        enhanced_prompt = create_enhanced_user_prompt(niche_data)
-        
-        st.info("🎬 Generating 9 unique ideas with detailed video scripts for Veo 3 compatibility...")
-        
-        # Generate content with structured output - increased limits for 9 ideas
-        response = model.generate_content(
-            enhanced_prompt,
-            generation_config=genai.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=JSON_SCHEMA,
-                temperature=0.9,  # High creativity for originality across 9 ideas
-                max_output_tokens=6144  # Increased significantly for 9 detailed video scripts
-            )
-        )
-        
-        # Parse the JSON response
-        content_ideas = json.loads(response.text)
-        
-        # Validate we got exactly 9 ideas
-        if len(content_ideas) != 9:
-            st.warning(f"Expected 9 ideas, got {len(content_ideas)}. Proceeding with available ideas.")
-        
-        # Validate and log ideas to database if available
-        if DB_AVAILABLE:
-            logged_ideas = []
-            duplicate_count = 0
-            
-            # Track day counters for each niche during this session
-            session_counters = {
-                "MMO": niche_data.get("MMO", 0),
-                "AI/Tech": niche_data.get("AI/Tech", 0),
-                "Faceless": niche_data.get("Faceless", 0)
-            }
-            
-            for i, idea in enumerate(content_ideas, 1):
-                try:
-                    title = idea.get('title', '')
-                    niche_display = idea.get('niche', '')
-                    
-                    # Map display niche back to database niche
-                    db_niche = None
-                    if "Personal Finance" in niche_display or "Money" in niche_display:
-                        db_niche = "MMO"
-                    elif "AI" in niche_display or "Tech" in niche_display:
-                        db_niche = "AI/Tech"
-                    elif "Faceless" in niche_display:
-                        db_niche = "Faceless"
-                    
-                    if db_niche and title:
-                        # Check for duplication
-                        if not check_for_duplication(title):
-                            # Increment the session counter for this niche
-                            session_counters[db_niche] += 1
-                            next_day = session_counters[db_niche]
-                            
-                            if log_idea(title, db_niche, next_day):
-                                logged_ideas.append(f"{db_niche} Day {next_day}")
-                        else:
-                            duplicate_count += 1
-                            st.warning(f"⚠️ Potential duplicate detected: {title[:50]}...")
-                            
-                except Exception as e:
-                    st.error(f"Error processing idea {i}: {e}")
-            
-            if logged_ideas:
-                st.success(f"✅ Successfully logged {len(logged_ideas)} new ideas: {', '.join(logged_ideas)}")
-            if duplicate_count > 0:
-                st.warning(f"⚠️ {duplicate_count} potential duplicate(s) detected")
-        
-        st.success(f"🎬 Generated {len(content_ideas)} ideas with detailed video scripts!")
-        return content_ideas
-        
-    except json.JSONDecodeError as je:
-        error_msg = f"Error parsing JSON response: {je}"
-        st.error(error_msg)
-        raise Exception(error_msg)
-    except Exception as e:
-        error_msg = f"Error generating content: {e}"
-        st.error(error_msg)
-        raise Exception(error_msg)
 
 
 def generate_viral_ideas():
@@ -679,17 +1039,18 @@ def generate_viral_ideas():
     Main function to generate viral content ideas with database integration.
     
     Returns:
-        str: JSON string of generated content ideas, or None if error
+        List[Dict[str, Any]]: Generated content ideas, or None if error
     """
     try:
-        # Initialize Gemini client
-        model = initialize_gemini_client()
+        # Initialize Gemini client (cached per API key across reruns)
+        api_key = get_gemini_api_key()
+        model = initialize_gemini_client(api_key)
+        if st.session_state.get('gemini_configured_key') != api_key:
+            st.success("🔗 Gemini API configured successfully")
+            st.session_state.gemini_configured_key = api_key
         
         # Generate content ideas with database integration
-        content_ideas = generate_content_ideas(model)
-        
-        # Return JSON string
-        return json.dumps(content_ideas, indent=4, ensure_ascii=False)
+        return generate_content_ideas(model, get_rate_limiter(api_key))
         
     except Exception as e:
         st.error(f"🚨 Generation Error: {e}")
@@ -791,7 +1152,7 @@ def show_user_dashboard():
     if not AUTH_AVAILABLE:
         return
     
-    user_stats = get_user_stats(st.session_state.user_id)
+    user_stats = _cached_user_stats(st.session_state.user_id)
     
     with st.sidebar:
         st.markdown("---")
@@ -804,7 +1165,7 @@ def show_user_dashboard():
         
         # Add team interface
         if TEAMS_AVAILABLE:
-            show_teams_interface()
+            _team_ui().show_teams_interface()
             if st.sidebar.button("🏢 Team Dashboard", key="teams_dashboard"):
                 st.session_state.show_teams_page = True
                 st.rerun()
@@ -837,24 +1198,106 @@ def check_authentication():
     
     return False
 
+# Bolds the "Part N:" / "Audio N:" labels of an audio script in one pass
+_AUDIO_PART_RE = re.compile(r'((?:Part|Audio) [123]):')
+
+def _format_idea_markdown(idea: Dict[str, Any]) -> str:
+    """Render an idea's title, caption hook, video shots and audio script as a single markdown block"""
+    sections = [
+        f"**🎯 Title:** {idea['title']}",
+        f"**📝 Caption Hook:** {idea['caption_hook']}",
+        "**🎬 Video Script (3 Shots):**"
+    ]
+    
+    # Format video script for better readability
+    video_script = idea.get('video_script', '')
+    if video_script:
+        # Split into individual shots if properly formatted
+        shots = video_script.split('Shot')
+        if len(shots) > 1:
+            sections.extend(
+                f"  **Shot {j}:** {shot.strip()}"
+                for j, shot in enumerate(shots[1:], 1) if shot.strip()
+            )
+        else:
+            # Display as single block if not formatted as shots
+            sections.append(video_script)
+    
+    audio_script = idea.get('full_audio_script', '')
+    if audio_script:
+        sections.append("**🎙️ Audio Script (Google TTS Ready):**")
+        # Split audio script into parts if formatted
+        if 'Part 1:' in audio_script or 'Audio 1:' in audio_script:
+            sections.append(_AUDIO_PART_RE.sub(r'**\1:**', audio_script))
+        else:
+            sections.append(audio_script)
+    else:
+        sections.append("**🎙️ Audio Script:** Not available in this generation")
+    
+    return "\n\n".join(sections)
+
+
+# Static sidebar content - each block is sent as one markdown element instead of a st.write per line
+_SIDEBAR_ABOUT_MD = """
+## 📋 About
+Generate viral content ideas for:
+- 💰 Personal Finance
+- 🤖 AI/Tech Tutorials
+- 🎯 Faceless Theme Pages
+"""
+
+_API_KEY_GUIDE_MD = """
+**Step 1:** Visit Google AI Studio  
+👉 [https://makersuite.google.com/app/apikey](https://makersuite.google.com/app/apikey)
+
+**Step 2:** Sign in with Google Account
+- Use your existing Google account
+- Or create a new one (free)
+
+**Step 3:** Create API Key
+- Click 'Create API Key'
+- Choose 'Create API key in new project'
+- Copy the generated key
+
+**Step 4:** Paste Key Below
+- The key starts with 'AIza...'
+- Keep it private and secure
+"""
+
+_PRIVACY_NOTICE_MD = """
+**🛡️ Your API Key is SAFE:**
+- ✅ NOT stored on any server
+- ✅ NOT logged or recorded
+- ✅ Only used for this session
+- ✅ Automatically cleared when you close the app
+
+**🔐 Technical Details:**
+- Key is stored in temporary session memory only
+- Direct communication: Your Browser → Google AI
+- No third-party servers involved
+- Application runs locally on your machine
+"""
+
+
 def main_app():
     st.set_page_config(layout="wide", page_title="AI Content Factory", page_icon="💡")
     
     # Show API Key setup in sidebar (must be done first)
     api_key_configured = False
     if API_MANAGER_AVAILABLE:
-        api_key_configured = ensure_api_key_configured()
+        api_key_configured = _api_manager().ensure_api_key_configured()
         # Show database access option
-        show_database_access()
+        _api_manager().show_database_access()
     
     # Show team modals if needed
-    if TEAMS_AVAILABLE:
-        show_create_team_modal()
-        show_join_team_modal()
+    if TEAMS_AVAILABLE and (st.session_state.get('show_create_team', False) or
+                            st.session_state.get('show_join_team', False)):
+        _team_ui().show_create_team_modal()
+        _team_ui().show_join_team_modal()
     
     # Check if user wants to view team dashboard
     if st.session_state.get('show_teams_page', False):
-        show_team_dashboard()
+        _team_ui().show_team_dashboard()
         if st.button("🔙 Back to Content Generator"):
             st.session_state.show_teams_page = False
             st.rerun()
@@ -864,18 +1307,15 @@ def main_app():
     st.subheader("Generate 9 Unique Video Ideas with Detailed Scripts using Gemini AI")
     
     # Show API key requirement message if not configured
-    if not api_key_configured and not os.getenv('GEMINI_API_KEY'):
+    if not api_key_configured and not _has_api_key():
         st.warning("⚠️ Please configure your Gemini API key in the sidebar to start generating content!")
         st.info("👈 Check the sidebar for API key setup instructions.")
         return
     
     # Sidebar for information
     with st.sidebar:
-        st.header("📋 About")
-        st.write("Generate viral content ideas for:")
-        st.write("• 💰 Personal Finance")
-        st.write("• 🤖 AI/Tech Tutorials")
-        st.write("• 🎯 Faceless Theme Pages")
+        st.markdown(_SIDEBAR_ABOUT_MD)
+        st.checkbox("🐞 Debug mode", key="debug_mode", help="Show full error tracebacks")
         
         # Database Status
         st.header("🗄️ Content Tracking")
@@ -912,38 +1352,13 @@ def main_app():
             st.header("🔧 API Key Setup")
             
             with st.expander("🔑 How to Get Your Free API Key", expanded=False):
-                st.write("**Step 1:** Visit Google AI Studio")
-                st.write("👉 [https://makersuite.google.com/app/apikey](https://makersuite.google.com/app/apikey)")
-                
-                st.write("**Step 2:** Sign in with Google Account")
-                st.write("• Use your existing Google account")
-                st.write("• Or create a new one (free)")
-                
-                st.write("**Step 3:** Create API Key")
-                st.write("• Click 'Create API Key'")
-                st.write("• Choose 'Create API key in new project'")
-                st.write("• Copy the generated key")
-                
-                st.write("**Step 4:** Paste Key Below")
-                st.write("• The key starts with 'AIza...'")
-                st.write("• Keep it private and secure")
+                st.markdown(_API_KEY_GUIDE_MD)
             
             st.info("💡 **Tip:** The Gemini API has a generous free tier - perfect for content generation!")
         
         # Privacy Notice
         with st.expander("🔒 Privacy & Security Notice", expanded=False):
-            st.write("**🛡️ Your API Key is SAFE:**")
-            st.write("• ✅ NOT stored on any server")
-            st.write("• ✅ NOT logged or recorded")
-            st.write("• ✅ Only used for this session")
-            st.write("• ✅ Automatically cleared when you close the app")
-            
-            st.write("**🔐 Technical Details:**")
-            st.write("• Key is stored in temporary session memory only")
-            st.write("• Direct communication: Your Browser → Google AI")
-            st.write("• No third-party servers involved")
-            st.write("• Application runs locally on your machine")
-            
+            st.markdown(_PRIVACY_NOTICE_MD)
             st.success("🔒 **100% Privacy Guaranteed** - We never see or store your API key!")
         
         # API Key input
@@ -957,14 +1372,14 @@ def main_app():
         
         if api_key_input:
             # Validate API key format
-            if api_key_input.startswith('AIza') and len(api_key_input) > 35:
-                # Set the environment variable for this session
-                os.environ['GEMINI_API_KEY'] = api_key_input
+            if _is_valid_api_key_format(api_key_input):
+                # Kept per session: os.environ is shared by every session in the process
+                st.session_state.gemini_api_key = api_key_input
                 st.success("✅ Valid API Key Set")
                 st.info("🚀 Ready to generate content!")
             else:
                 st.error("❌ Invalid API key format")
-                st.write("Expected format: AIzaSy...")
+                st.write("Expected format: AIzaSy... (starts with 'AIza', at least 36 characters)")
         else:
             st.warning("⚠️ API Key Required")
             st.write("👆 Get your free key from Google AI Studio")
@@ -981,39 +1396,49 @@ def main_app():
         st.write("• 🗄️ **Auto-logging** - Tracks your content progression")
         
         # Check if API key is available before showing the button
-        if not os.getenv('GEMINI_API_KEY'):
+        if not _has_api_key():
             st.warning("⚠️ Please enter your Gemini API key in the sidebar first.")
             st.stop()
         
-        # The button to trigger the API call
-        if st.button("🚀 Generate 9 Viral Ideas (Same Day - Morning/Evening/Night)", type="primary", use_container_width=True):
+        # Block a second generation while one is still in flight for this session
+        generation_running = st.session_state.get('_gen_in_flight', False)
+        if generation_running:
+            st.info("⏳ Generation already running... please wait for it to finish.")
+        
+        # The button to trigger the API call - a click only sets the flag and reruns, so the
+        # button is already rendered disabled while the generation below runs on the next pass
+        if st.button("🚀 Generate 9 Viral Ideas (Same Day - Morning/Evening/Night)", type="primary",
+                     use_container_width=True, disabled=generation_running):
+            st.session_state._gen_in_flight = True
+            st.rerun()
+        
+        if generation_running:
             with st.spinner("🎬 Connecting to Gemini AI and generating 9 time-slot optimized ideas with detailed Veo 3.1 + Audio scripts..."):
-                json_output = generate_viral_ideas()  # Calls enhanced logic with 9 ideas
+                try:
+                    ideas = generate_viral_ideas()  # Calls enhanced logic with 9 ideas
+                finally:
+                    # Cleared on success, error and interrupted runs alike
+                    st.session_state._gen_in_flight = False
 
-                if json_output:
+                if ideas:
                     st.success("✅ 9 Video Ideas Generated Successfully!")
                     
-                    # Parse and display the content ideas in a more user-friendly way
+                    # Display the content ideas in a more user-friendly way
                     try:
-                        ideas = json.loads(json_output)
-                        
                         # Log generation activity for authenticated users
                         if AUTH_AVAILABLE and 'user_id' in st.session_state:
                             niches_used = ", ".join(set([idea['niche'] for idea in ideas]))
                             session_id = st.session_state.get('session_id', '')
-                            log_generation_activity(st.session_state.user_id, len(ideas), niches_used, session_id)
+                            # Fire-and-forget on the background writer so rendering doesn't wait on the insert
+                            _db_executor().submit(_record_generation_activity, st.session_state.user_id, len(ideas), niches_used, session_id)
                         
                         # Group ideas by niche for better organization
-                        niches = {"Make Money Online / Personal Finance": [], "AI/Tech Tutorials": [], "Faceless Theme Page": []}
+                        niches = {NICHE_DISPLAY_NAMES[db_niche]: [] for db_niche in NICHES}
                         
                         for idea in ideas:
-                            niche = idea['niche']
-                            if "Personal Finance" in niche or "Money" in niche:
-                                niches["Make Money Online / Personal Finance"].append(idea)
-                            elif "AI" in niche or "Tech" in niche:
-                                niches["AI/Tech Tutorials"].append(idea)
-                            elif "Faceless" in niche:
-                                niches["Faceless Theme Page"].append(idea)
+                            db_niche = _db_niche_for(idea['niche'])
+                            if db_niche:
+                                niches[NICHE_DISPLAY_NAMES[db_niche]].append(idea)
                         
                         # Display ideas grouped by niche
                         for niche_name, niche_ideas in niches.items():
@@ -1022,50 +1447,12 @@ def main_app():
                                 
                                 for i, idea in enumerate(niche_ideas, 1):
                                     with st.expander(f"💡 Idea {i}: {idea['title']}", expanded=True):
-                                        st.write(f"**🎯 Title:** {idea['title']}")
-                                        st.write(f"**📝 Caption Hook:** {idea['caption_hook']}")
-                                        st.write(f"**� Video Script (3 Shots):**")
-                                        
-                                        # Format video script for better readability
-                                        video_script = idea.get('video_script', '')
-                                        if video_script:
-                                            # Split into individual shots if properly formatted
-                                            shots = video_script.split('Shot')
-                                            if len(shots) > 1:
-                                                for j, shot in enumerate(shots[1:], 1):
-                                                    shot_content = shot.strip()
-                                                    if shot_content:
-                                                        st.write(f"  **Shot {j}:** {shot_content}")
-                                            else:
-                                                # Display as single block if not formatted as shots
-                                                st.write(video_script)
-                                        
-                                        # Display Audio Script (ADDED MISSING FEATURE!)
-                                        audio_script = idea.get('full_audio_script', '')
-                                        if audio_script:
-                                            st.write(f"**🎙️ Audio Script (Google TTS Ready):**")
-                                            # Split audio script into parts if formatted
-                                            if 'Part 1:' in audio_script or 'Audio 1:' in audio_script:
-                                                parts = audio_script.replace('Part 1:', '**Part 1:**').replace('Part 2:', '**Part 2:**').replace('Part 3:', '**Part 3:**')
-                                                parts = parts.replace('Audio 1:', '**Audio 1:**').replace('Audio 2:', '**Audio 2:**').replace('Audio 3:', '**Audio 3:**')
-                                                st.markdown(parts)
-                                            else:
-                                                st.write(audio_script)
-                                        else:
-                                            st.write("**🎙️ Audio Script:** Not available in this generation")
+                                        # One markdown element per idea instead of a separate st.write per line
+                                        st.markdown(_format_idea_markdown(idea))
                                         
                                         # Show database status for this idea
                                         if DB_AVAILABLE:
-                                            niche_display = idea['niche']
-                                            if "Personal Finance" in niche_display or "Money" in niche_display:
-                                                db_niche = "MMO"
-                                            elif "AI" in niche_display or "Tech" in niche_display:
-                                                db_niche = "AI/Tech"
-                                            elif "Faceless" in niche_display:
-                                                db_niche = "Faceless"
-                                            else:
-                                                db_niche = None
-                                            
+                                            db_niche = _db_niche_for(idea['niche'])
                                             if db_niche:
                                                 try:
                                                     current_day = get_current_day(db_niche)
@@ -1073,28 +1460,27 @@ def main_app():
                                                 except:
                                                     st.caption("🗄️ Database tracking active")
                                         
-                                        # Add copy buttons for each element
-                                        col_a, col_b, col_c, col_d = st.columns(4)
-                                        unique_key = f"{niche_name}_{i}"
-                                        with col_a:
-                                            if st.button(f"📋 Copy Title", key=f"title_{unique_key}"):
-                                                st.write("Title copied to clipboard!")
-                                        with col_b:
-                                            if st.button(f"📋 Copy Caption", key=f"caption_{unique_key}"):
-                                                st.write("Caption copied to clipboard!")
-                                        with col_c:
-                                            if st.button(f"📋 Copy Video Script", key=f"script_{unique_key}"):
-                                                st.write("Video script copied!")
-                                        with col_d:
-                                            if st.button(f"📋 Copy Audio Script", key=f"audio_{unique_key}"):
-                                                st.write("Audio script copied!")
+                                        # Copy-ready text - st.code renders a native copy-to-clipboard icon.
+                                        # Tabs instead of a nested expander, which Streamlit doesn't allow.
+                                        title_tab, caption_tab, video_tab, audio_tab = st.tabs(
+                                            ["📋 Title", "📋 Caption", "📋 Video Script", "📋 Audio Script"]
+                                        )
+                                        with title_tab:
+                                            st.code(idea['title'], language=None)
+                                        with caption_tab:
+                                            st.code(idea['caption_hook'], language=None)
+                                        with video_tab:
+                                            st.code(idea.get('video_script', ''), language=None)
+                                        with audio_tab:
+                                            st.code(idea.get('full_audio_script', ''), language=None)
                         
                         # Show raw JSON in an expander
                         with st.expander("🔍 View Raw JSON Output (All 9 Ideas)"):
-                            st.json(json.loads(json_output))
+                            st.json(ideas)
                         
                         # Database summary for all 9 ideas
                         if DB_AVAILABLE:
+                            show_idea_log_result()
                             with st.expander("📊 Content Progression Summary"):
                                 try:
                                     mmo_day = get_current_day("MMO")
@@ -1118,11 +1504,11 @@ def main_app():
                         # Team sharing functionality
                         if TEAMS_AVAILABLE and AUTH_AVAILABLE and st.session_state.get('authenticated', False):
                             niches_used = ", ".join(set([idea['niche'] for idea in ideas]))
-                            add_team_share_button(json_output, len(ideas), niches_used)
+                            _team_ui().add_team_share_button(ideas, len(ideas), niches_used)
                             
-                    except json.JSONDecodeError:
-                        st.error("Error parsing generated content")
-                        st.text(json_output)
+                    except (KeyError, TypeError) as display_error:
+                        st.error(f"Error displaying generated content: {display_error}")
+                        st.json(ideas)
                 else:
                     st.error("❌ Error: Could not generate video ideas. Check your API Key and try again.")
                     
@@ -1194,10 +1580,11 @@ def main_app():
 
 
 if __name__ == "__main__":
-    # Main application with authentication
-    if AUTH_AVAILABLE and not check_authentication():
+    # Main application with authentication (session verified once per rerun)
+    authenticated = AUTH_AVAILABLE and check_authentication()
+    if AUTH_AVAILABLE and not authenticated:
         show_login_page()
     else:
-        if AUTH_AVAILABLE and check_authentication():
+        if authenticated:
             show_user_dashboard()  # Show user stats in sidebar
         main_app()
\ No newline at end of file
@@ -6,16 +6,272 @@ A complete SQLite database management system for tracking generated content idea
 preventing duplicates, and managing continuation sequences.
 """
 
+import logging
 import sqlite3
 import os
-from typing import Optional, Tuple
-from datetime import datetime
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple, List, Set, Iterable, Iterator, Dict
+from datetime import date, datetime, time as dt_time, timedelta
+
+from db_pool import get_conn
+
+# Fuzzy title matching (optional - falls back to exact matching)
+try:
+    from rapidfuzz import process, fuzz, utils
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
 
 
 # Database configuration
 DB_NAME = 'content_tracker.db'
 DB_PATH = os.path.join(os.path.dirname(__file__), DB_NAME)
 
+# Rows fetched per round trip when streaming query results (see get_all_ideas)
+FETCH_BATCH_SIZE = 256
+
+# Bump whenever setup_database's table / index / migration steps change (stored in PRAGMA user_version)
+SCHEMA_VERSION = 3
+
+# Niches are stored as small integers (1-byte keys in every index); names are translated at the boundary
+_NICHE_ID = {'MMO': 0, 'AI/Tech': 1, 'Faceless': 2}
+_NICHE_NAME = {niche_id: name for name, niche_id in _NICHE_ID.items()}
+
+# Titles scoring at or above this token-set similarity (0-100) count as duplicates
+FUZZY_MATCH_THRESHOLD = 85
+
+# In-memory multiset of every stored title (lowercased), so duplicate checks skip SQLite.
+# Loaded on first use and kept in sync by log_idea / log_idea_bulk; a Counter rather than a
+# set because the same-day overwrite can delete one copy of a title that is stored twice.
+_title_counts: Optional[Counter] = None
+_title_counts_version = 0  # Bumped on every change or drop, so a load racing a write is not installed
+_title_cache_lock = threading.Lock()
+
+
+def _get_title_counts() -> Counter:
+    """
+    Return the in-memory title multiset, loading it with a single query on first use.
+    
+    The query runs without _title_cache_lock held: log_idea_bulk takes that lock while it still
+    holds a pooled connection, so waiting for a connection under the lock could deadlock.
+    
+    Raises:
+        sqlite3.Error: If the titles cannot be loaded
+    """
+    global _title_counts
+    
+    with _title_cache_lock:
+        if _title_counts is not None:
+            return _title_counts
+        version = _title_counts_version
+    
+    with get_conn(DB_PATH) as conn:
+        rows = conn.execute('SELECT title FROM ideas_log').fetchall()
+    loaded = Counter(row[0].lower() for row in rows)
+    
+    with _title_cache_lock:
+        if _title_counts is None and _title_counts_version == version:
+            _title_counts = loaded
+            logger.debug("🧠 Loaded %s titles into the duplicate-check cache", len(rows))
+        # A write committed meanwhile: answer this call from the snapshot and let the next one reload
+        return _title_counts if _title_counts is not None else loaded
+
+
+def _update_title_counts(added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+    """Apply committed inserts and deletes to the title cache (no-op until it has been loaded)"""
+    global _title_counts_version
+    
+    with _title_cache_lock:
+        _title_counts_version += 1
+        if _title_counts is None:
+            return
+        for title in added:
+            _title_counts[title.lower()] += 1
+        # Only the deleted titles are touched; a title goes once its last stored copy is deleted
+        for title in removed:
+            key = title.lower()
+            remaining = _title_counts[key] - 1
+            if remaining > 0:
+                _title_counts[key] = remaining
+            else:
+                _title_counts.pop(key, None)
+
+
+def _discard_title_counts() -> None:
+    """Drop the title cache so the next duplicate check reloads it from the database"""
+    global _title_counts, _title_counts_version
+    
+    with _title_cache_lock:
+        _title_counts = None
+        _title_counts_version += 1
+
+
+# Per-niche memo of get_current_day results as (date, day). Keyed on the date so the counter
+# moves on at midnight, and dropped by log_idea / log_idea_bulk when a niche's rows change.
+_current_day_cache: Dict[str, Tuple[int, int]] = {}
+_current_day_lock = threading.Lock()
+
+
+def _invalidate_current_day(niches: Iterable[str]) -> None:
+    """Forget the memoized current day for niches whose rows were just committed"""
+    with _current_day_lock:
+        for niche in niches:
+            _current_day_cache.pop(niche, None)
+
+
+def _date_key(moment: date) -> int:
+    """Encode a date as the YYYYMMDD integer stored in ideas_log.generation_date"""
+    return moment.year * 10000 + moment.month * 100 + moment.day
+
+
+# (valid until, today's date key) - recomputed only once the next local midnight has passed
+_today_key_cache: Tuple[float, int] = (0.0, 0)
+
+
+def _today_key() -> int:
+    """Return today's date key, reusing the cached value until local midnight"""
+    global _today_key_cache
+    
+    valid_until, key = _today_key_cache
+    if time.time() < valid_until:
+        return key
+    
+    today = date.today()
+    next_midnight = datetime.combine(today + timedelta(days=1), dt_time.min).timestamp()
+    key = _date_key(today)
+    _today_key_cache = (next_midnight, key)
+    return key
+
+
+# Hot-path statements, defined once so every call (and log_idea / log_idea_bulk alike) sends
+# identical SQL text and hits the connection's compiled-statement cache instead of re-preparing
+_SQL_INSERT_IDEA = '''
+    INSERT INTO ideas_log (title, niche, continuation_day, created_at, generation_date)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+_SQL_DELETE_TODAY_RETURNING = '''
+    DELETE FROM ideas_log 
+    WHERE niche = ? AND generation_date = ?
+    RETURNING title
+'''
+
+_SQL_SELECT_TODAY_TITLES = '''
+    SELECT title FROM ideas_log 
+    WHERE niche = ? AND generation_date = ?
+'''
+
+_SQL_DELETE_TODAY = '''
+    DELETE FROM ideas_log 
+    WHERE niche = ? AND generation_date = ?
+'''
+
+_SQL_CURRENT_DAY = '''
+    SELECT 
+        MAX(CASE WHEN generation_date < ? THEN continuation_day END),
+        MIN(CASE WHEN generation_date = ? THEN continuation_day END)
+    FROM ideas_log 
+    WHERE niche = ?
+'''
+
+_SQL_DUP_CHECK = '''
+    SELECT 1 
+    FROM ideas_log 
+    WHERE title = ? COLLATE NOCASE 
+    LIMIT 1
+'''
+
+# DELETE ... RETURNING needs SQLite 3.35+; older builds select the rows before deleting them
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _delete_today(cursor: sqlite3.Cursor, niche_id: int, today: int, return_titles: bool) -> Tuple[int, List[str]]:
+    """
+    Delete a niche's ideas for today and return (deleted count, deleted titles).
+    
+    Titles are only fetched when return_titles is set (one statement where supported);
+    otherwise this is a bare DELETE and the count comes from cursor.rowcount.
+    """
+    if not return_titles:
+        cursor.execute(_SQL_DELETE_TODAY, (niche_id, today))
+        return cursor.rowcount, []
+    
+    if SQLITE_HAS_RETURNING:
+        cursor.execute(_SQL_DELETE_TODAY_RETURNING, (niche_id, today))
+        titles = [row[0] for row in cursor.fetchall()]
+        return len(titles), titles
+    
+    cursor.execute(_SQL_SELECT_TODAY_TITLES, (niche_id, today))
+    titles = [row[0] for row in cursor.fetchall()]
+    if titles:
+        cursor.execute(_SQL_DELETE_TODAY, (niche_id, today))
+    return len(titles), titles
+
+
+# ideas_log schema - niche (see _NICHE_ID) and generation_date (YYYYMMDD) are integers so index
+# keys are small fixed-width ints
+_SQL_CREATE_IDEAS_LOG = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        niche INTEGER NOT NULL,
+        continuation_day INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        generation_date INTEGER NOT NULL,
+        CHECK (continuation_day > 0),
+        CHECK (niche BETWEEN 0 AND 2)
+    )
+'''
+
+
+def _migrate_ideas_log(cursor: sqlite3.Cursor) -> None:
+    """
+    Rebuild a pre-existing ideas_log whose niche or generation_date isn't stored as INTEGER yet,
+    or whose id still uses AUTOINCREMENT (an extra sqlite_sequence write on every insert).
+    
+    SQLite can't change a column's type in place, so the rows are copied into a table with the
+    current schema (niche name -> _NICHE_ID, 'YYYY-MM-DD' -> YYYYMMDD; rows without a date get
+    today's, as before). Indexes are recreated by setup_database afterwards.
+    """
+    cursor.execute("PRAGMA table_info(ideas_log)")
+    column_types = {row[1]: row[2].upper() for row in cursor.fetchall()}
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'ideas_log'")
+    uses_autoincrement = 'AUTOINCREMENT' in cursor.fetchone()[0].upper()
+    if (column_types.get('niche') == 'INTEGER' and column_types.get('generation_date') == 'INTEGER'
+            and not uses_autoincrement):
+        return
+    
+    if column_types.get('niche') == 'INTEGER':
+        niche_expr = "niche"
+    else:
+        niche_expr = "CASE niche " + " ".join(
+            f"WHEN '{name}' THEN {niche_id}" for name, niche_id in _NICHE_ID.items()
+        ) + " END"
+    
+    today = _today_key()
+    if column_types.get('generation_date') == 'INTEGER':
+        date_expr = "COALESCE(generation_date, ?)"
+    elif 'generation_date' in column_types:
+        date_expr = "COALESCE(CAST(REPLACE(generation_date, '-', '') AS INTEGER), ?)"
+    else:
+        date_expr = "?"
+    
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute(_SQL_CREATE_IDEAS_LOG.format(table='ideas_log_migrated'))
+    cursor.execute(f'''
+        INSERT INTO ideas_log_migrated (id, title, niche, continuation_day, created_at, generation_date)
+        SELECT id, title, {niche_expr}, continuation_day, created_at, {date_expr} FROM ideas_log
+    ''', (today,))
+    migrated = cursor.rowcount
+    cursor.execute('DROP TABLE ideas_log')
+    cursor.execute('ALTER TABLE ideas_log_migrated RENAME TO ideas_log')
+    cursor.connection.commit()
+    logger.info("🔄 Migrated %s ideas to the INTEGER niche / generation date layout", migrated)
+
 
 def setup_database() -> None:
     """
@@ -23,12 +279,15 @@ def setup_database() -> None:
     Enhanced with comprehensive error handling and validation.
     
     Creates the content_tracker.db file and the ideas_log table with the following schema:
-    - id: INTEGER PRIMARY KEY (auto-increment)
+    - id: INTEGER PRIMARY KEY (rowid alias, assigned automatically)
     - title: TEXT NOT NULL (for duplication checking)
-    - niche: TEXT NOT NULL (content category)
+    - niche: INTEGER NOT NULL (content category, see _NICHE_ID)
     - continuation_day: INTEGER NOT NULL (sequence tracking)
     - created_at: TEXT (timestamp, default CURRENT_TIMESTAMP)
-    - generation_date: TEXT (date only, YYYY-MM-DD format for daily logic)
+    - generation_date: INTEGER (date only, YYYYMMDD format for daily logic)
+    
+    Databases created with the older TEXT niche / 'YYYY-MM-DD' generation_date columns (or without
+    generation_date) are migrated in place to the INTEGER layout.
     """
     try:
         # Validate database directory permissions
@@ -36,64 +295,57 @@ def setup_database() -> None:
         if not os.access(db_dir, os.W_OK):
             raise PermissionError(f"No write permission to database directory: {db_dir}")
         
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_conn(DB_PATH) as conn:
             cursor = conn.cursor()
             
-            # Enable foreign keys and enhance database settings
-            cursor.execute('PRAGMA foreign_keys = ON')
-            cursor.execute('PRAGMA journal_mode = WAL')  # Better concurrency
-            cursor.execute('PRAGMA synchronous = NORMAL')  # Balance safety and speed
+            # WAL / synchronous settings are applied to every pooled connection by db_pool
+            
+            # Skip the schema work entirely once the file is at the current version
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] >= SCHEMA_VERSION:
+                logger.debug("✅ Database schema up to date (version %s): %s", SCHEMA_VERSION, DB_PATH)
+                return
             
             # Create the ideas_log table with enhanced daily tracking
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ideas_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    niche TEXT NOT NULL,
-                    continuation_day INTEGER NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    generation_date TEXT NOT NULL,
-                    CHECK (continuation_day > 0),
-                    CHECK (niche IN ('MMO', 'AI/Tech', 'Faceless'))
-                )
-            ''')
+            cursor.execute(_SQL_CREATE_IDEAS_LOG.format(table='ideas_log'))
             
-            # Add generation_date column if it doesn't exist (for existing databases)
-            cursor.execute('''
-                SELECT sql FROM sqlite_master WHERE type='table' AND name='ideas_log'
-            ''')
-            table_schema = cursor.fetchone()
-            if table_schema and 'generation_date' not in table_schema[0]:
-                cursor.execute('''
-                    ALTER TABLE ideas_log ADD COLUMN generation_date TEXT
-                ''')
-                # Update existing records with today's date
-                today = datetime.now().strftime('%Y-%m-%d')
-                cursor.execute('''
-                    UPDATE ideas_log SET generation_date = ? WHERE generation_date IS NULL
-                ''', (today,))
+            # Migrate databases created with the older TEXT niche / generation_date columns
+            _migrate_ideas_log(cursor)
             
             # Create indexes for faster lookups
+            # Case-insensitive title index, replacing the plain idx_title that LOWER(title) lookups couldn't use
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_title ON ideas_log(title)
+                CREATE INDEX IF NOT EXISTS idx_title_nocase ON ideas_log(title COLLATE NOCASE)
             ''')
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_niche_date ON ideas_log(niche, generation_date)
+                DROP INDEX IF EXISTS idx_title
             ''')
-            
-            # Create index for faster niche-based queries
+            # Covers the (niche, generation_date) filters and the MIN/MAX(continuation_day) lookups
+            # index-only
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_niche_day ON ideas_log(niche, continuation_day)
+                CREATE INDEX IF NOT EXISTS idx_niche_date_day ON ideas_log(niche, generation_date, continuation_day)
             ''')
             
+            # Drop indexes no hot query uses any more - each one costs a B-tree write per insert/delete
+            # (idx_niche_date is a prefix of idx_niche_date_day; idx_niche_day only served the
+            # occasional per-niche get_all_ideas sort)
+            for obsolete_index in ('idx_niche_date', 'idx_niche_day'):
+                cursor.execute(f'DROP INDEX IF EXISTS {obsolete_index}')
+            
+            # Refresh the planner statistics for the new indexes
+            cursor.execute('ANALYZE')
+            
+            # Record the version so later calls skip the block above (PRAGMA can't take parameters)
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            
             conn.commit()
-            print(f"✅ Database setup completed successfully: {DB_PATH}")
+            logger.info("✅ Database setup completed successfully: %s", DB_PATH)
             
     except sqlite3.Error as e:
-        print(f"❌ Database setup error: {e}")
+        logger.error("❌ Database setup error: %s", e)
         raise
     except Exception as e:
-        print(f"❌ Unexpected error during database setup: {e}")
+        logger.error("❌ Unexpected error during database setup: %s", e)
         raise
 
 
@@ -116,58 +368,102 @@ def log_idea(title: str, niche: str, continuation_day: int, time_slot: str = Non
         
     Raises:
         ValueError: If any required parameter is empty or invalid
-        sqlite3.Error: If database operation fails
     """
-    # Validate inputs
-    if not title or not title.strip():
-        raise ValueError("Title cannot be empty")
-    if not niche or not niche.strip():
-        raise ValueError("Niche cannot be empty")
-    if continuation_day < 1:
-        raise ValueError("Continuation day must be a positive integer")
+    # A one-row batch - same validation, overwrite rules and single transaction as log_idea_bulk
+    return log_idea_bulk([(title, niche, continuation_day)])
+
+
+def log_idea_bulk(ideas: List[Tuple[str, str, int]]) -> bool:
+    """
+    Insert a whole generation of content ideas in a single transaction with daily overwrite logic.
+    
+    Daily Logic Rules (applied per niche in the batch):
+    - Today's existing ideas for the niche are replaced by the new batch (overwrite same day)
+    - Cross-day progression is preserved: ideas from previous days are never touched
+    
+    Args:
+        ideas (List[Tuple[str, str, int]]): (title, niche, continuation_day) tuples to insert
+        
+    Returns:
+        bool: True if the batch was inserted (rows rejected by table constraints are skipped), False otherwise
+        
+    Raises:
+        ValueError: If any title or niche is empty or a continuation day is invalid
+    """
+    rows = []
+    for title, niche, continuation_day in ideas:
+        # Strip once and reuse the result for both the check and the stored row
+        title = title.strip() if title else ''
+        niche = niche.strip() if niche else ''
+        if not title:
+            raise ValueError("Title cannot be empty")
+        if not niche:
+            raise ValueError("Niche cannot be empty")
+        if continuation_day < 1:
+            raise ValueError("Continuation day must be a positive integer")
+        rows.append((title, niche, continuation_day))
+    
+    if not rows:
+        return True
     
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_conn(DB_PATH) as conn:
             cursor = conn.cursor()
             
-            # Get today's date
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            # Check if we have any ideas for this niche from today
-            cursor.execute('''
-                SELECT id, continuation_day FROM ideas_log 
-                WHERE niche = ? AND generation_date = ?
-            ''', (niche.strip(), today))
-            
-            existing_today = cursor.fetchall()
-            
-            if existing_today:
-                # Delete all ideas from today for this niche (overwrite same day)
-                cursor.execute('''
-                    DELETE FROM ideas_log 
-                    WHERE niche = ? AND generation_date = ?
-                ''', (niche.strip(), today))
-                print(f"🔄 Overwriting {len(existing_today)} existing ideas from today for {niche}")
-            
-            # Insert the new idea with today's date
-            cursor.execute('''
-                INSERT INTO ideas_log (title, niche, continuation_day, created_at, generation_date)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (title.strip(), niche.strip(), continuation_day, datetime.now().isoformat(), today))
+            # Take the write lock up front so the delete + insert never waits on a lock upgrade
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # Get today's date and timestamp once for the whole batch
+            now = datetime.now()
+            today = _date_key(now)
+            created_at = now.isoformat()
+            
+            # Delete today's ideas for every niche in this batch (overwrite same day).
+            # The deleted titles are only needed to keep an already-loaded title cache in sync.
+            track_titles = _title_counts is not None
+            removed_titles = []
+            for niche in {row[1] for row in rows}:
+                deleted, niche_removed = _delete_today(cursor, _NICHE_ID.get(niche), today, track_titles)
+                if deleted > 0:
+                    logger.debug("🔄 Overwriting %s existing ideas from today for %s", deleted, niche)
+                removed_titles.extend(niche_removed)
+            
+            # Insert the new ideas with today's date
+            # Unknown niches map to NULL and are rejected by the NOT NULL constraint like any bad row
+            insert_rows = [(title, _NICHE_ID.get(niche), day, created_at, today) for title, niche, day in rows]
+            cursor.execute('SAVEPOINT bulk_insert')
+            try:
+                cursor.executemany(_SQL_INSERT_IDEA, insert_rows)
+                inserted_titles = [row[0] for row in insert_rows]
+            except sqlite3.IntegrityError as e:
+                # A row violated a constraint - fall back to per-row inserts and skip the bad rows
+                cursor.execute('ROLLBACK TO SAVEPOINT bulk_insert')
+                logger.warning("⚠️ Batch insert failed (%s), retrying row by row", e)
+                inserted_titles = []
+                for row in insert_rows:
+                    try:
+                        cursor.execute(_SQL_INSERT_IDEA, row)
+                        inserted_titles.append(row[0])
+                    except sqlite3.IntegrityError as row_error:
+                        logger.error("❌ Skipped idea %s...: %s", row[0][:50], row_error)
+            cursor.execute('RELEASE SAVEPOINT bulk_insert')
             
             conn.commit()
+            if track_titles:
+                _update_title_counts(added=inserted_titles, removed=removed_titles)
+            else:
+                # The cache may have been loaded from a pre-commit snapshot meanwhile - let it reload
+                _discard_title_counts()
+            _invalidate_current_day({row[1] for row in rows})
+            logger.debug("✅ Logged %s/%s ideas in one transaction", len(inserted_titles), len(rows))
             
-            # Get the ID of the inserted record
-            idea_id = cursor.lastrowid
-            print(f"✅ Idea logged successfully (ID: {idea_id}): {title[:50]}...")
-            
-            return True
+            return len(inserted_titles) > 0
             
     except sqlite3.Error as e:
-        print(f"❌ Database error while logging idea: {e}")
+        logger.error("❌ Database error while logging ideas: %s", e)
         return False
     except Exception as e:
-        print(f"❌ Unexpected error while logging idea: {e}")
+        logger.error("❌ Unexpected error while logging ideas: %s", e)
         return False
 
 
@@ -191,51 +487,50 @@ def get_current_day(niche: str) -> int:
     if not niche or not niche.strip():
         raise ValueError("Niche cannot be empty")
     
+    niche = niche.strip()
+    
+    # Get today's date
+    today = _today_key()
+    
+    # Serve from the memo until this niche is next logged (or the date changes)
+    with _current_day_lock:
+        cached = _current_day_cache.get(niche)
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_conn(DB_PATH) as conn:
             cursor = conn.cursor()
             
-            # Get today's date
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            # Query for the maximum continuation_day for the specified niche
-            # EXCLUDE today's entries to prevent day increment on same-day regeneration
-            cursor.execute('''
-                SELECT MAX(continuation_day) 
-                FROM ideas_log 
-                WHERE niche = ? AND generation_date != ?
-            ''', (niche.strip(), today))
+            # One pass over the niche's idx_niche_date_day entries for both values:
+            # - the maximum continuation_day from previous days (today EXCLUDED to prevent day
+            #   increment on same-day regeneration)
+            # - the lowest day of today's batch, if one has already been logged
+            cursor.execute(_SQL_CURRENT_DAY, (today, today, _NICHE_ID.get(niche)))
             
-            result = cursor.fetchone()
+            historical_max, today_day = cursor.fetchone()
             
             # Return the max day or 0 if no records exist
-            max_day = result[0] if result[0] is not None else 0
-            
-            # Check if we have any entries from today for this niche
-            cursor.execute('''
-                SELECT continuation_day FROM ideas_log 
-                WHERE niche = ? AND generation_date = ?
-                LIMIT 1
-            ''', (niche.strip(), today))
-            
-            today_result = cursor.fetchone()
-            
-            if today_result:
+            max_day = historical_max if historical_max is not None else 0
+            if today_day is not None:
                 # If we have entries from today, return the day from today's entry
-                current_day = today_result[0] - 1  # Subtract 1 because we'll add 1 later
-                print(f"📊 Current day for '{niche}': {current_day} (continuing today's Day {today_result[0]})")
+                current_day = today_day - 1  # Subtract 1 because we'll add 1 later
+                logger.debug("📊 Current day for '%s': %s (continuing today's Day %s)", niche, current_day, today_day)
             else:
                 # No entries from today, return historical max
                 current_day = max_day
-                print(f"📊 Current day for '{niche}': {current_day} (from historical records)")
+                logger.debug("📊 Current day for '%s': %s (from historical records)", niche, current_day)
+            
+            with _current_day_lock:
+                _current_day_cache[niche] = (today, current_day)
             
             return current_day
             
     except sqlite3.Error as e:
-        print(f"❌ Database error while getting current day: {e}")
+        logger.error("❌ Database error while getting current day: %s", e)
         raise
     except Exception as e:
-        print(f"❌ Unexpected error while getting current day: {e}")
+        logger.error("❌ Unexpected error while getting current day: %s", e)
         raise
 
 
@@ -256,49 +551,120 @@ def check_for_duplication(title: str) -> bool:
     if not title or not title.strip():
         raise ValueError("Title cannot be empty")
     
+    # Once the title cache is loaded (kept in sync on every write) answer from memory
+    with _title_cache_lock:
+        cached_titles = _title_counts
+        is_duplicate = cached_titles is not None and title.strip().lower() in cached_titles
+    if cached_titles is not None:
+        logger.debug("%s '%s...'", "⚠️ Duplicate detected:" if is_duplicate else "✅ Title is unique:", title[:50])
+        return is_duplicate
+    
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_conn(DB_PATH) as conn:
             cursor = conn.cursor()
             
-            # Check for exact title match (case-insensitive)
-            cursor.execute('''
-                SELECT COUNT(*) 
-                FROM ideas_log 
-                WHERE LOWER(title) = LOWER(?)
-            ''', (title.strip(),))
+            # Check for exact title match (case-insensitive) - probes idx_title_nocase and stops at the first hit
+            cursor.execute(_SQL_DUP_CHECK, (title.strip(),))
             
-            result = cursor.fetchone()
-            is_duplicate = result[0] > 0
+            is_duplicate = cursor.fetchone() is not None
             
             if is_duplicate:
-                print(f"⚠️ Duplicate detected: '{title[:50]}...'")
+                logger.debug("⚠️ Duplicate detected: '%s...'", title[:50])
             else:
-                print(f"✅ Title is unique: '{title[:50]}...'")
+                logger.debug("✅ Title is unique: '%s...'", title[:50])
                 
             return is_duplicate
             
     except sqlite3.Error as e:
-        print(f"❌ Database error while checking duplication: {e}")
+        logger.error("❌ Database error while checking duplication: %s", e)
         raise
     except Exception as e:
-        print(f"❌ Unexpected error while checking duplication: {e}")
+        logger.error("❌ Unexpected error while checking duplication: %s", e)
         raise
 
 
-def get_all_ideas(niche: Optional[str] = None, limit: Optional[int] = None) -> list:
+def check_for_duplication_bulk(titles: List[str]) -> Set[str]:
     """
-    Retrieve all ideas from the database, optionally filtered by niche.
+    Check a batch of titles for duplicates against the in-memory title cache.
+    
+    The cache is loaded from the database once per process and kept up to date by the
+    logging functions, so steady-state checks never touch SQLite.
+    
+    When rapidfuzz is installed, near-duplicates are caught as well: every new title is
+    scored against the stored history with token_set_ratio, and any score at or above
+    FUZZY_MATCH_THRESHOLD counts as a duplicate (e.g. "5 AI Tools You Need" vs
+    "5 AI Tools You NEED Today"). Without rapidfuzz, matching is exact and case-insensitive.
+    
+    Args:
+        titles (List[str]): The titles to check for duplication
+        
+    Returns:
+        Set[str]: The (stripped) input titles that already exist in the database
+        
+    Raises:
+        sqlite3.Error: If the title cache cannot be loaded
+    """
+    candidates = list({title.strip() for title in titles if title and title.strip()})
+    if not candidates:
+        return set()
+    
+    try:
+        title_counts = _get_title_counts()
+    except sqlite3.Error as e:
+        logger.error("❌ Database error while checking duplication: %s", e)
+        raise
+    
+    with _title_cache_lock:
+        if not RAPIDFUZZ_AVAILABLE:
+            duplicates = {title for title in candidates if title.lower() in title_counts}
+            logger.debug("🔍 Checked %s titles: %s duplicate(s) found", len(candidates), len(duplicates))
+            return duplicates
+        
+        existing_titles = list(title_counts)
+    
+    # Score all new titles against the whole history in one vectorised call
+    duplicates = set()
+    if existing_titles:
+        scores = process.cdist(
+            candidates,
+            existing_titles,
+            scorer=fuzz.token_set_ratio,
+            processor=utils.default_process,
+            score_cutoff=FUZZY_MATCH_THRESHOLD
+        )
+        duplicates = {
+            title for title, row in zip(candidates, scores)
+            if row.max() >= FUZZY_MATCH_THRESHOLD
+        }
+    
+    logger.debug("🔍 Checked %s titles against %s stored: %s near-duplicate(s) found", len(candidates), len(existing_titles), len(duplicates))
+    return duplicates
+
+
+def get_all_ideas(niche: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Tuple]:
+    """
+    Stream ideas from the database, optionally filtered by niche.
+    
+    Rows are fetched in batches of FETCH_BATCH_SIZE as the caller iterates, so large result sets
+    are never materialized at once; use list(get_all_ideas(...)) when a list is needed.
+    
+    The generator holds one of db_pool's POOL_SIZE connections from the first next() until it is
+    exhausted or closed, so consume it promptly (or close it) rather than keeping it around.
     
     Args:
         niche (Optional[str]): Filter by specific niche, or None for all niches
         limit (Optional[int]): Maximum number of records to return, or None for all
         
-    Returns:
-        list: List of tuples containing (id, title, niche, continuation_day, created_at)
+    Yields:
+        tuple: (id, title, niche, continuation_day, created_at) for each idea
+        
+    Raises:
+        sqlite3.Error: If the query fails, raised from the iteration instead of ending it silently
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_conn(DB_PATH) as conn:
             cursor = conn.cursor()
+            cursor.arraysize = FETCH_BATCH_SIZE
             
             if niche:
                 query = '''
@@ -306,31 +672,40 @@ def get_all_ideas(niche: Optional[str] = None, limit: Optional[int] = None) -> l
                     FROM ideas_log 
                     WHERE niche = ?
                     ORDER BY continuation_day DESC, created_at DESC
+                    LIMIT ?
                 '''
-                params = (niche.strip(),)
+                params = (_NICHE_ID.get(niche.strip()),)
             else:
                 query = '''
                     SELECT id, title, niche, continuation_day, created_at 
                     FROM ideas_log 
                     ORDER BY created_at DESC
+                    LIMIT ?
                 '''
                 params = ()
             
-            if limit:
-                query += f' LIMIT {limit}'
+            # Always bound so each variant is one stable SQL text (LIMIT -1 means no limit)
+            params += (int(limit) if limit else -1,)
             
             cursor.execute(query, params)
-            results = cursor.fetchall()
             
-            print(f"📋 Retrieved {len(results)} ideas" + (f" for niche '{niche}'" if niche else ""))
-            return results
+            retrieved = 0
+            while True:
+                batch = cursor.fetchmany()
+                if not batch:
+                    break
+                retrieved += len(batch)
+                for idea_id, title, niche_id, day, created_at in batch:
+                    yield idea_id, title, _NICHE_NAME.get(niche_id), day, created_at
+            
+            logger.debug("📋 Retrieved %s ideas%s", retrieved, f" for niche '{niche}'" if niche else "")
             
     except sqlite3.Error as e:
-        print(f"❌ Database error while retrieving ideas: {e}")
-        return []
+        logger.error("❌ Database error while retrieving ideas: %s", e)
+        raise
     except Exception as e:
-        print(f"❌ Unexpected error while retrieving ideas: {e}")
-        return []
+        logger.error("❌ Unexpected error while retrieving ideas: %s", e)
+        raise
 
 
 def get_database_stats() -> dict:
@@ -341,12 +716,18 @@ def get_database_stats() -> dict:
         dict: Statistics including total ideas, ideas per niche, and date range
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_conn(DB_PATH) as conn:
             cursor = conn.cursor()
             
-            # Total ideas count
-            cursor.execute('SELECT COUNT(*) FROM ideas_log')
-            total_ideas = cursor.fetchone()[0]
+            # One read transaction so every figure comes from the same snapshot
+            cursor.execute('BEGIN')
+            
+            # Total ideas count and date range in a single pass
+            cursor.execute('''
+                SELECT COUNT(*), MIN(created_at) as first_idea, MAX(created_at) as latest_idea
+                FROM ideas_log
+            ''')
+            total_ideas, first_idea, latest_idea = cursor.fetchone()
             
             # Ideas per niche
             cursor.execute('''
@@ -355,24 +736,17 @@ def get_database_stats() -> dict:
                 GROUP BY niche 
                 ORDER BY count DESC
             ''')
-            niche_stats = cursor.fetchall()
-            
-            # Date range
-            cursor.execute('''
-                SELECT MIN(created_at) as first_idea, MAX(created_at) as latest_idea
-                FROM ideas_log
-            ''')
-            date_range = cursor.fetchone()
+            niche_stats = [(_NICHE_NAME.get(niche_id), count, max_day) for niche_id, count, max_day in cursor.fetchall()]
             
             return {
                 'total_ideas': total_ideas,
                 'niche_breakdown': niche_stats,
-                'first_idea_date': date_range[0],
-                'latest_idea_date': date_range[1]
+                'first_idea_date': first_idea,
+                'latest_idea_date': latest_idea
             }
             
     except sqlite3.Error as e:
-        print(f"❌ Database error while getting stats: {e}")
+        logger.error("❌ Database error while getting stats: %s", e)
         return {}
 
 
@@ -437,4 +811,5 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     exit(main())
\ No newline at end of file
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite Connection Pool for Content Tracker
+Keeps a few long-lived, pragma-configured connections per database file so
+helpers borrow a warm connection instead of opening a new one on every call.
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+# Pool configuration - SQLite serializes writers, so one writer plus a few readers is enough
+POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256  # Compiled statements kept per connection (sqlite3 default is 128)
+
+# Applied once to every pooled connection when it is opened
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',          # Readers don't block the writer
+    'PRAGMA synchronous = NORMAL',        # Safe with WAL, avoids an fsync per commit
+    'PRAGMA temp_store = MEMORY',         # Temp B-trees for GROUP BY / ORDER BY stay in RAM
+    'PRAGMA cache_size = -64000',         # ~64MB page cache per connection
+    'PRAGMA mmap_size = 268435456',       # Read pages through a 256MB memory map
+    'PRAGMA busy_timeout = 30000',        # Wait up to 30s for a lock instead of failing
+    'PRAGMA wal_autocheckpoint = 1000',   # Checkpoint the WAL every ~1000 pages
+    'PRAGMA foreign_keys = ON',           # Enforce declared references (team / auth tables)
+)
+
+_pools: Dict[str, queue.LifoQueue] = {}
+_opened: Dict[str, int] = {}
+_pools_lock = threading.Lock()
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Open a connection that can be shared between threads and apply the pool pragmas"""
+    conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _acquire(db_path: str) -> sqlite3.Connection:
+    """Take an idle connection, opening a new one while the pool is below POOL_SIZE"""
+    with _pools_lock:
+        pool = _pools.setdefault(db_path, queue.LifoQueue())
+        try:
+            return pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        if _opened.get(db_path, 0) < POOL_SIZE:
+            _opened[db_path] = _opened.get(db_path, 0) + 1
+            open_new = True
+        else:
+            open_new = False
+
+    if open_new:
+        try:
+            return _open_connection(db_path)
+        except sqlite3.Error:
+            with _pools_lock:
+                _opened[db_path] -= 1
+            raise
+
+    # Every connection is in use - wait for one to be returned
+    return pool.get()
+
+@contextmanager
+def get_conn(db_path: str):
+    """
+    Borrow a pooled connection for db_path.
+    Behaves like `with sqlite3.connect(db_path) as conn`: commits on success,
+    rolls back on error, and returns the connection to the pool instead of closing it.
+    """
+    conn = _acquire(db_path)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _pools[db_path].put(conn)
+
+def close_all():
+    """Close every idle pooled connection (registered to run at interpreter exit)"""
+    with _pools_lock:
+        for db_path, pool in _pools.items():
+            while True:
+                try:
+                    conn = pool.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    conn.execute('PRAGMA optimize')  # Refresh planner stats where SQLite thinks it helps
+                except sqlite3.Error:
+                    pass
+                conn.close()
+                _opened[db_path] -= 1
+
+atexit.register(close_all)
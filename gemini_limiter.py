@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side Rate Limiter for Gemini API Calls
+Sliding-window requests/tokens per minute limiter with AIMD adjustment on 429 responses
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+# Google AI defaults for the free tier
+DEFAULT_RPM = 60
+DEFAULT_TPM = 100_000
+WINDOW_SECONDS = 60.0
+
+# AIMD profile: halve the request rate on a 429, recover by one request per minute per success
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_STEP = 1.0
+MIN_RPM = 1.0
+
+class TokenBucket:
+    """Sliding-window limiter for requests and tokens per minute with AIMD rate adjustment"""
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM):
+        self.max_rpm = float(rpm)
+        self.rpm = float(rpm)
+        self.tpm = tpm
+        self._window = deque()  # (timestamp, tokens) of calls in the last minute
+        self._window_tokens = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Record the call and return 0, or return how long to wait before it fits the window"""
+        now = time.monotonic()
+
+        with self._lock:
+            # Drop calls that have left the window
+            while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+                self._window_tokens -= self._window.popleft()[1]
+
+            over_rpm = len(self._window) >= int(self.rpm)
+            over_tpm = self._window and self._window_tokens + tokens > self.tpm
+            if not over_rpm and not over_tpm:
+                self._window.append((now, tokens))
+                self._window_tokens += tokens
+                return 0.0
+
+            # Wait until the oldest call leaves the window, then check again
+            return WINDOW_SECONDS - (now - self._window[0][0])
+
+    async def acquire(self, tokens: int):
+        """Wait until a call estimated at `tokens` tokens fits in the current window"""
+        while True:
+            wait_seconds = self._reserve(tokens)
+            if wait_seconds <= 0:
+                return
+            await asyncio.sleep(wait_seconds)
+
+    def on_rate_limited(self):
+        """Multiplicative decrease after a 429 from the API"""
+        with self._lock:
+            self.rpm = max(MIN_RPM, self.rpm * RATE_DECREASE_FACTOR)
+
+    def on_success(self):
+        """Additive recovery towards the configured rate after a successful call"""
+        with self._lock:
+            self.rpm = min(self.max_rpm, self.rpm + RATE_INCREASE_STEP)
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api_key: str) -> TokenBucket:
+    """Return the process-wide limiter for an API key (quotas are per key, shared by all sessions)"""
+    key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = TokenBucket()
+        return limiter
+
+def estimate_tokens(prompt: str, max_output_tokens: int) -> int:
+    """Rough token estimate for a call: ~4 characters per prompt token plus the output budget"""
+    return len(prompt) // 4 + max_output_tokens
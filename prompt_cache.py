@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Prompt Response Cache for AI Content Generator
+Short-lived in-process cache that lets a session retry a failed generation without calling Gemini again
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Cache configuration
+MAX_ENTRIES = 500
+TTL_SECONDS = 120  # A retry within this window reuses the responses the failed attempt already received
+
+_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _prompt_key(scope: str, prompt: str) -> str:
+    """Hash the scope (one browser session) and full prompt text into a compact cache key"""
+    return hashlib.sha256(f"{scope}\0{prompt}".encode('utf-8')).hexdigest()
+
+def get_cached_response(scope: str, prompt: str) -> Optional[str]:
+    """Return the response cached for a prompt in this scope, or None if missing or expired"""
+    key = _prompt_key(scope, prompt)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+
+        stored_at, response_text = entry
+        if time.monotonic() - stored_at > TTL_SECONDS:
+            del _cache[key]
+            return None
+
+        # Mark as most recently used
+        _cache.move_to_end(key)
+        return response_text
+
+def store_response(scope: str, prompt: str, response_text: str):
+    """Cache a response for a prompt in this scope, evicting the least recently used entries"""
+    key = _prompt_key(scope, prompt)
+
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), response_text)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def discard_response(scope: str, prompt: str):
+    """Forget a prompt's response once its ideas have been delivered, so the next request is generated fresh"""
+    with _cache_lock:
+        _cache.pop(_prompt_key(scope, prompt), None)
+
+def clear_cache():
+    """Drop every cached response"""
+    with _cache_lock:
+        _cache.clear()
@@ -4,28 +4,127 @@ Team Collaboration System for AI Content Generator
 Production-ready team management with invitations, roles, and project sharing
 """
 
+import atexit
+import logging
+import queue
 import sqlite3
+import threading
+import time
 import uuid
-import hashlib
+import secrets
 import os
 import smtplib
-from datetime import datetime, timedelta
+import zlib
+from collections import OrderedDict
 from typing import Optional, Tuple, List, Dict
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from db_pool import get_conn
+
+logger = logging.getLogger(__name__)
+
 # Database path
 DB_NAME = 'content_tracker_users_niche.db'
 DB_PATH = os.path.join(os.path.dirname(__file__), DB_NAME)
 
+def _connect():
+    """Borrow a pooled connection to the team database (WAL and tuned pragmas applied by db_pool)"""
+    return get_conn(DB_PATH)
+
+# Team permissions are stored as a bitmask (team_members / team_invitations.permissions_mask)
+PERMISSION_BITS = {'read': 1, 'write': 2, 'generate': 4, 'invite': 8, 'manage': 16}
+OWNER_PERMISSIONS = PERMISSION_BITS['read'] | PERMISSION_BITS['write'] | PERMISSION_BITS['invite'] | PERMISSION_BITS['manage']
+MEMBER_PERMISSIONS = PERMISSION_BITS['read'] | PERMISSION_BITS['generate']
+INVITER_PERMISSIONS = MEMBER_PERMISSIONS | PERMISSION_BITS['invite']
+
+def permission_names(mask: int) -> List[str]:
+    """Expand a permission bitmask into its permission names"""
+    return [name for name, bit in PERMISSION_BITS.items() if mask & bit]
+
+def _migrate_permission_masks(cursor: sqlite3.Cursor):
+    """Add permissions_mask to tables created with the comma-separated permissions column and backfill it"""
+    mask_expr = ' | '.join(
+        f"(CASE WHEN instr(permissions, '{name}') > 0 THEN {bit} ELSE 0 END)"
+        for name, bit in PERMISSION_BITS.items()
+    )
+    
+    for table in ('team_members', 'team_invitations'):
+        columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+        if 'permissions_mask' in columns:
+            continue
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN permissions_mask INTEGER DEFAULT {MEMBER_PERMISSIONS}')
+        cursor.execute(f'UPDATE {table} SET permissions_mask = {mask_expr}')
+    
+    # The membership indexes used to cover the TEXT column - recreated below over the mask
+    cursor.execute('DROP INDEX IF EXISTS idx_tm_user_team')
+    cursor.execute('DROP INDEX IF EXISTS idx_tm_team_user')
+
+# Invitations expire this long after they are sent. Timestamps are local-time ISO-8601 strings
+# built by SQLite (same layout as the datetime.isoformat() values in older rows).
+INVITATION_TTL_DAYS = 7
+INVITATION_EXPIRY = f'+{INVITATION_TTL_DAYS} days'
+
+# shared_generations.generation_data holds zlib-compressed JSON (rows shared before this are plain TEXT)
+GENERATION_COMPRESSION_LEVEL = 6
+
+def _pack_generation_data(generation_data: str) -> bytes:
+    """Compress a generation's JSON text for storage"""
+    return zlib.compress(generation_data.encode('utf-8'), GENERATION_COMPRESSION_LEVEL)
+
+def _unpack_generation_data(stored) -> str:
+    """Return the JSON text of a stored generation, compressed or legacy TEXT"""
+    if isinstance(stored, bytes):
+        return zlib.decompress(stored).decode('utf-8')
+    return stored
+
+# Secondary indexes created by setup_team_database
+TEAM_INDEXES = (
+    # get_user_teams: members by user, covering the role / permissions it returns
+    'CREATE INDEX IF NOT EXISTS idx_tm_user_team ON team_members(user_id, team_id, is_active, role, permissions_mask)',
+    # is_team_member / has_team_permission: members by team, covering permissions
+    'CREATE INDEX IF NOT EXISTS idx_tm_team_user ON team_members(team_id, user_id, is_active, permissions_mask)',
+    # accept_team_invitation: pending invitations by token
+    "CREATE INDEX IF NOT EXISTS idx_inv_token ON team_invitations(invitation_token) WHERE status = 'pending'",
+    # invite_team_member: pending-invitation check per team and email
+    'CREATE INDEX IF NOT EXISTS idx_inv_team_email ON team_invitations(team_id, invited_email, status)',
+    # get_shared_generations / generation counts per project, newest first (id DESC for the page keyset)
+    'CREATE INDEX IF NOT EXISTS idx_sg_project_page ON shared_generations(project_id, created_at DESC, id DESC)',
+    # get_team_projects: active projects per team, newest first
+    'CREATE INDEX IF NOT EXISTS idx_tp_team_status ON team_projects(team_id, status, created_at DESC)',
+    # get_team_activity: recent activity per team, same page keyset
+    'CREATE INDEX IF NOT EXISTS idx_ta_team_page ON team_activity(team_id, created_at DESC, id DESC)',
+)
+
+# Keep teams.member_count equal to the team's active members
+TEAM_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS trg_tm_count_insert AFTER INSERT ON team_members
+       WHEN NEW.is_active = 1
+       BEGIN
+           UPDATE teams SET member_count = member_count + 1 WHERE team_id = NEW.team_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_tm_count_update AFTER UPDATE OF is_active, team_id ON team_members
+       BEGIN
+           UPDATE teams SET member_count = member_count - (OLD.is_active = 1) WHERE team_id = OLD.team_id;
+           UPDATE teams SET member_count = member_count + (NEW.is_active = 1) WHERE team_id = NEW.team_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_tm_count_delete AFTER DELETE ON team_members
+       WHEN OLD.is_active = 1
+       BEGIN
+           UPDATE teams SET member_count = member_count - 1 WHERE team_id = OLD.team_id;
+       END''',
+)
+
+# Superseded by the keyset indexes above, dropped by setup_team_database
+RETIRED_TEAM_INDEXES = ('idx_sg_project', 'idx_ta_team_created')
+
 def setup_team_database():
     """Initialize team collaboration tables with enhanced error handling"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
-            # Enable foreign keys for data integrity
-            cursor.execute('PRAGMA foreign_keys = ON')
+            # WAL, foreign keys and the other connection settings are applied by db_pool
             
             # Teams table
             cursor.execute('''
@@ -39,6 +138,7 @@ def setup_team_database():
                     is_active INTEGER DEFAULT 1,
                     max_members INTEGER DEFAULT 10,
                     plan_type TEXT DEFAULT 'free',
+                    member_count INTEGER DEFAULT 0,
                     FOREIGN KEY (owner_id) REFERENCES auth_users (user_id)
                 )
             ''')
@@ -53,7 +153,7 @@ def setup_team_database():
                     joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     invited_by TEXT,
                     is_active INTEGER DEFAULT 1,
-                    permissions TEXT DEFAULT 'read,generate',
+                    permissions_mask INTEGER DEFAULT 5,  -- read | generate
                     FOREIGN KEY (team_id) REFERENCES teams (team_id),
                     FOREIGN KEY (user_id) REFERENCES auth_users (user_id),
                     UNIQUE(team_id, user_id)
@@ -71,7 +171,7 @@ def setup_team_database():
                     invitation_token TEXT NOT NULL,
                     status TEXT DEFAULT 'pending',
                     role TEXT DEFAULT 'member',
-                    permissions TEXT DEFAULT 'read,generate',
+                    permissions_mask INTEGER DEFAULT 5,  -- read | generate
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     expires_at TEXT NOT NULL,
                     accepted_at TEXT,
@@ -106,7 +206,8 @@ def setup_team_database():
                     project_id TEXT NOT NULL,
                     team_id TEXT NOT NULL,
                     created_by TEXT NOT NULL,
-                    generation_data TEXT NOT NULL,
+                    generation_data BLOB NOT NULL,
+                    summary TEXT,
                     ideas_count INTEGER DEFAULT 0,
                     niches_used TEXT,
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
@@ -149,11 +250,44 @@ def setup_team_database():
                 )
             ''')
             
+            # Databases created before the bitmask still carry comma-separated permissions
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(team_members)')}
+            if 'permissions_mask' not in columns:
+                _migrate_permission_masks(cursor)
+            
+            # Member counts are kept on the teams row; backfill databases created before that
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(teams)')}
+            if 'member_count' not in columns:
+                cursor.execute('ALTER TABLE teams ADD COLUMN member_count INTEGER DEFAULT 0')
+                cursor.execute('''
+                    UPDATE teams SET member_count = (
+                        SELECT COUNT(*) FROM team_members
+                        WHERE team_members.team_id = teams.team_id AND is_active = 1
+                    )
+                ''')
+            for trigger_sql in TEAM_TRIGGERS:
+                cursor.execute(trigger_sql)
+            
+            # List views read a short summary instead of the full generation payload
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(shared_generations)')}
+            if 'summary' not in columns:
+                cursor.execute('ALTER TABLE shared_generations ADD COLUMN summary TEXT')
+            
+            # Indexes for the hot lookup paths (permission / membership checks, listings, invitations).
+            # The membership ones carry every column those queries read, so no table row is visited.
+            for index_sql in TEAM_INDEXES:
+                cursor.execute(index_sql)
+            for index_name in RETIRED_TEAM_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+            
+            # Refresh the planner statistics so the new indexes get picked up
+            cursor.execute('ANALYZE')
+            
             conn.commit()
-            print("✅ Team collaboration database setup completed")
+            logger.info("✅ Team collaboration database setup completed")
             
     except Exception as e:
-        print(f"❌ Team database setup error: {e}")
+        logger.error("❌ Team database setup error: %s", e)
 
 # TEAM MANAGEMENT FUNCTIONS
 
@@ -165,11 +299,14 @@ def create_team(owner_id: str, team_name: str, description: str = "", max_member
             
         team_id = str(uuid.uuid4())
         
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
+            # One write transaction for the checks, inserts and activity log (writer lock taken up front)
+            cursor.execute('BEGIN IMMEDIATE')
+            
             # Check if user already has a team with this name
-            cursor.execute('SELECT team_name FROM teams WHERE owner_id = ? AND team_name = ?', (owner_id, team_name))
+            cursor.execute('SELECT 1 FROM teams WHERE owner_id = ? AND team_name = ? LIMIT 1', (owner_id, team_name))
             if cursor.fetchone():
                 return False, "You already have a team with this name", None
             
@@ -181,14 +318,15 @@ def create_team(owner_id: str, team_name: str, description: str = "", max_member
             
             # Add owner as admin member
             cursor.execute('''
-                INSERT INTO team_members (team_id, user_id, role, permissions)
-                VALUES (?, ?, 'admin', 'read,write,invite,manage')
-            ''', (team_id, owner_id))
+                INSERT INTO team_members (team_id, user_id, role, permissions_mask)
+                VALUES (?, ?, 'admin', ?)
+            ''', (team_id, owner_id, OWNER_PERMISSIONS))
             
             # Log activity
-            log_team_activity(team_id, owner_id, "team_created", f"Team '{team_name}' created")
+            log_team_activity(team_id, owner_id, "team_created", f"Team '{team_name}' created", conn=conn)
             
             conn.commit()
+            invalidate_team_cache(team_id, owner_id)
             return True, f"Team '{team_name}' created successfully!", team_id
             
     except Exception as e:
@@ -197,63 +335,62 @@ def create_team(owner_id: str, team_name: str, description: str = "", max_member
 def invite_team_member(team_id: str, inviter_id: str, email: str, role: str = "member") -> Tuple[bool, str]:
     """Invite a user to join the team"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
+            # Take the writer lock before the checks so a duplicate invitation can't slip in between
+            cursor.execute('BEGIN IMMEDIATE')
+            
             # Check if inviter has permission
             cursor.execute('''
-                SELECT role, permissions FROM team_members 
+                SELECT role, permissions_mask FROM team_members 
                 WHERE team_id = ? AND user_id = ? AND is_active = 1
             ''', (team_id, inviter_id))
             
             inviter_info = cursor.fetchone()
-            if not inviter_info or 'invite' not in inviter_info[1]:
+            if not inviter_info or not inviter_info[1] & PERMISSION_BITS['invite']:
                 return False, "You don't have permission to invite members"
             
-            # Check if email is already invited or member
+            # Check if email is already invited or member (both checks in one statement)
             cursor.execute('''
-                SELECT status FROM team_invitations 
-                WHERE team_id = ? AND invited_email = ? AND status = 'pending'
-            ''', (team_id, email))
-            
-            if cursor.fetchone():
+                SELECT 
+                    EXISTS(
+                        SELECT 1 FROM team_invitations 
+                        WHERE team_id = ? AND invited_email = ? AND status = 'pending'
+                    ),
+                    EXISTS(
+                        SELECT 1 FROM team_members tm
+                        JOIN auth_users u ON tm.user_id = u.user_id
+                        WHERE tm.team_id = ? AND u.email = ? AND tm.is_active = 1
+                    )
+            ''', (team_id, email, team_id, email))
+            
+            already_invited, already_member = cursor.fetchone()
+            if already_invited:
                 return False, "User already has a pending invitation"
-            
-            # Check if already a member
-            cursor.execute('''
-                SELECT u.email FROM team_members tm
-                JOIN auth_users u ON tm.user_id = u.user_id
-                WHERE tm.team_id = ? AND u.email = ? AND tm.is_active = 1
-            ''', (team_id, email))
-            
-            if cursor.fetchone():
+            if already_member:
                 return False, "User is already a team member"
             
             # Create invitation
             invitation_id = str(uuid.uuid4())
-            invitation_token = hashlib.sha256(f"{invitation_id}{email}{datetime.now().isoformat()}".encode()).hexdigest()
-            expires_at = (datetime.now() + timedelta(days=7)).isoformat()
+            invitation_token = secrets.token_urlsafe(32)  # CSPRNG, independent of the id and email
             
-            permissions = "read,generate" if role == "member" else "read,generate,invite"
+            permissions = MEMBER_PERMISSIONS if role == "member" else INVITER_PERMISSIONS
             
             cursor.execute('''
                 INSERT INTO team_invitations (
                     invitation_id, team_id, invited_email, invited_by, 
-                    invitation_token, role, permissions, expires_at
+                    invitation_token, role, permissions_mask, expires_at
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (invitation_id, team_id, email, inviter_id, invitation_token, role, permissions, expires_at))
-            
-            # Get team name for activity log
-            cursor.execute('SELECT team_name FROM teams WHERE team_id = ?', (team_id,))
-            team_name = cursor.fetchone()[0]
+                VALUES (?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime', ?))
+            ''', (invitation_id, team_id, email, inviter_id, invitation_token, role, permissions, INVITATION_EXPIRY))
             
-            log_team_activity(team_id, inviter_id, "member_invited", f"Invited {email} to join team")
+            log_team_activity(team_id, inviter_id, "member_invited", f"Invited {email} to join team", conn=conn)
             
             conn.commit()
             
             # TODO: Send email invitation (implement email service)
-            return True, f"Invitation sent to {email}. They have 7 days to accept."
+            return True, f"Invitation sent to {email}. They have {INVITATION_TTL_DAYS} days to accept."
             
     except Exception as e:
         return False, f"Error sending invitation: {str(e)}"
@@ -261,52 +398,51 @@ def invite_team_member(team_id: str, inviter_id: str, email: str, role: str = "m
 def accept_team_invitation(invitation_token: str, user_id: str) -> Tuple[bool, str]:
     """Accept a team invitation"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
-            # Find and validate invitation
+            # Validate, join and mark the invitation accepted in one transaction
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # Find and validate invitation, with the accepting user's email and the team name in the same row.
+            # expires_at is a local-time ISO-8601 string, so it compares directly against local 'now'.
             cursor.execute('''
-                SELECT invitation_id, team_id, role, permissions, expires_at, invited_email
-                FROM team_invitations 
-                WHERE invitation_token = ? AND status = 'pending'
-            ''', (invitation_token,))
+                SELECT i.invitation_id, i.team_id, i.role, i.permissions_mask, i.invited_email,
+                       u.email, t.team_name
+                FROM team_invitations i
+                LEFT JOIN auth_users u ON u.user_id = ?
+                LEFT JOIN teams t ON t.team_id = i.team_id
+                WHERE i.invitation_token = ? AND i.status = 'pending'
+                  AND i.expires_at > strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')
+            ''', (user_id, invitation_token))
             
             invitation = cursor.fetchone()
             if not invitation:
                 return False, "Invalid or expired invitation"
             
-            invitation_id, team_id, role, permissions, expires_at, invited_email = invitation
-            
-            # Check if expired
-            if datetime.fromisoformat(expires_at) < datetime.now():
-                return False, "Invitation has expired"
+            invitation_id, team_id, role, permissions, invited_email, user_email, team_name = invitation
             
             # Verify user email matches invitation
-            cursor.execute('SELECT email FROM auth_users WHERE user_id = ?', (user_id,))
-            user_email = cursor.fetchone()
-            if not user_email or user_email[0] != invited_email:
+            if not user_email or user_email != invited_email:
                 return False, "Invitation email doesn't match your account"
             
             # Add to team
             cursor.execute('''
-                INSERT INTO team_members (team_id, user_id, role, permissions)
+                INSERT INTO team_members (team_id, user_id, role, permissions_mask)
                 VALUES (?, ?, ?, ?)
             ''', (team_id, user_id, role, permissions))
             
             # Update invitation status
             cursor.execute('''
                 UPDATE team_invitations 
-                SET status = 'accepted', accepted_at = ?
+                SET status = 'accepted', accepted_at = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
                 WHERE invitation_id = ?
-            ''', (datetime.now().isoformat(), invitation_id))
+            ''', (invitation_id,))
             
-            # Get team name
-            cursor.execute('SELECT team_name FROM teams WHERE team_id = ?', (team_id,))
-            team_name = cursor.fetchone()[0]
-            
-            log_team_activity(team_id, user_id, "member_joined", f"Joined the team")
+            log_team_activity(team_id, user_id, "member_joined", f"Joined the team", conn=conn)
             
             conn.commit()
+            invalidate_team_cache(team_id, user_id)
             return True, f"Successfully joined team '{team_name}'!"
             
     except Exception as e:
@@ -323,15 +459,18 @@ def create_team_project(team_id: str, creator_id: str, project_name: str, descri
             
         project_id = str(uuid.uuid4())
         
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
+            # Project row and its activity entry commit together
+            cursor.execute('BEGIN IMMEDIATE')
+            
             cursor.execute('''
                 INSERT INTO team_projects (project_id, team_id, project_name, description, created_by, niches)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (project_id, team_id, project_name, description, creator_id, niches))
             
-            log_team_activity(team_id, creator_id, "project_created", f"Created project '{project_name}'")
+            log_team_activity(team_id, creator_id, "project_created", f"Created project '{project_name}'", conn=conn)
             
             conn.commit()
             return True, f"Project '{project_name}' created successfully!", project_id
@@ -339,26 +478,53 @@ def create_team_project(team_id: str, creator_id: str, project_name: str, descri
     except Exception as e:
         return False, f"Error creating project: {str(e)}", None
 
-def share_generation_to_team(team_id: str, project_id: str, user_id: str, generation_data: str, ideas_count: int, niches_used: str) -> Tuple[bool, str]:
+def share_generation_to_team(team_id: str, project_id: str, user_id: str, generation_data: str, ideas_count: int, niches_used: str,
+                             summary: str = "") -> Tuple[bool, str]:
     """Share a content generation with the team"""
+    return share_generations_bulk(team_id, project_id, user_id, [{
+        'generation_data': generation_data,
+        'ideas_count': ideas_count,
+        'niches_used': niches_used,
+        'summary': summary,
+    }])
+
+def share_generations_bulk(team_id: str, project_id: str, user_id: str, generations: List[Dict]) -> Tuple[bool, str]:
+    """Share several generations (dicts with generation_data / ideas_count / niches_used / summary) in one transaction"""
     try:
-        generation_id = str(uuid.uuid4())
+        if not generations:
+            return False, "Nothing to share"
         
-        with sqlite3.connect(DB_PATH) as conn:
+        rows = []
+        activities = []
+        for generation in generations:
+            ideas_count = generation.get('ideas_count', 0)
+            rows.append((
+                str(uuid.uuid4()), project_id, team_id, user_id,
+                _pack_generation_data(generation['generation_data']), generation.get('summary', ''),
+                ideas_count, generation.get('niches_used', ''),
+            ))
+            activities.append((team_id, user_id, "generation_shared", f"Shared {ideas_count} content ideas"))
+        
+        with _connect() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
+            # Shared generations and their activity entries commit together
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            cursor.executemany('''
                 INSERT INTO shared_generations (
                     generation_id, project_id, team_id, created_by, 
-                    generation_data, ideas_count, niches_used
+                    generation_data, summary, ideas_count, niches_used
                 )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (generation_id, project_id, team_id, user_id, generation_data, ideas_count, niches_used))
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
             
-            log_team_activity(team_id, user_id, "generation_shared", f"Shared {ideas_count} content ideas")
+            cursor.executemany(_SQL_LOG_ACTIVITY, activities)
             
             conn.commit()
-            return True, "Content shared with team successfully!"
+            if len(rows) == 1:
+                return True, "Content shared with team successfully!"
+            return True, f"{len(rows)} generations shared with team successfully!"
             
     except Exception as e:
         return False, f"Error sharing content: {str(e)}"
@@ -368,34 +534,28 @@ def share_generation_to_team(team_id: str, project_id: str, user_id: str, genera
 def get_user_teams(user_id: str) -> List[Dict]:
     """Get all teams user is a member of"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row  # Per-cursor, so other users of the pooled connection still get tuples
             
             cursor.execute('''
-                SELECT t.team_id, t.team_name, t.description, tm.role, tm.permissions, t.owner_id,
-                       (SELECT COUNT(*) FROM team_members WHERE team_id = t.team_id AND is_active = 1) as member_count
+                SELECT t.team_id, t.team_name, t.description, tm.role, tm.permissions_mask as permissions,
+                       t.owner_id = ? as is_owner, t.member_count
                 FROM teams t
                 JOIN team_members tm ON t.team_id = tm.team_id
                 WHERE tm.user_id = ? AND tm.is_active = 1 AND t.is_active = 1
                 ORDER BY t.created_at DESC
-            ''', (user_id,))
-            
-            teams = []
-            for row in cursor.fetchall():
-                teams.append({
-                    'team_id': row[0],
-                    'team_name': row[1],
-                    'description': row[2],
-                    'role': row[3],
-                    'permissions': row[4].split(','),
-                    'is_owner': row[5] == user_id,
-                    'member_count': row[6]
-                })
+            ''', (user_id, user_id))
+            
+            teams = [dict(row) for row in cursor.fetchall()]
+            for team in teams:
+                team['permissions'] = permission_names(team['permissions'])
+                team['is_owner'] = bool(team['is_owner'])
             
             return teams
             
     except Exception as e:
-        print(f"Error getting user teams: {e}")
+        logger.error("Error getting user teams: %s", e)
         return []
 
 def get_team_projects(team_id: str, user_id: str) -> List[Dict]:
@@ -405,168 +565,255 @@ def get_team_projects(team_id: str, user_id: str) -> List[Dict]:
         if not is_team_member(team_id, user_id):
             return []
             
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute('''
                 SELECT p.project_id, p.project_name, p.description, p.created_by, p.created_at, p.niches,
                        u.username as creator_name,
-                       (SELECT COUNT(*) FROM shared_generations WHERE project_id = p.project_id) as generation_count
+                       COALESCE(gc.generation_count, 0) as generation_count
                 FROM team_projects p
                 JOIN auth_users u ON p.created_by = u.user_id
+                LEFT JOIN (
+                    -- Generation counts in one grouped pass, limited to this team's projects
+                    SELECT project_id, COUNT(*) as generation_count
+                    FROM shared_generations
+                    WHERE project_id IN (SELECT project_id FROM team_projects WHERE team_id = ?)
+                    GROUP BY project_id
+                ) gc ON gc.project_id = p.project_id
                 WHERE p.team_id = ? AND p.status = 'active'
                 ORDER BY p.created_at DESC
-            ''', (team_id,))
-            
-            projects = []
-            for row in cursor.fetchall():
-                projects.append({
-                    'project_id': row[0],
-                    'project_name': row[1],
-                    'description': row[2],
-                    'created_by': row[3],
-                    'created_at': row[4],
-                    'niches': row[5],
-                    'creator_name': row[6],
-                    'generation_count': row[7]
-                })
-            
-            return projects
+            ''', (team_id, team_id))
+            
+            return [dict(row) for row in cursor.fetchall()]
             
     except Exception as e:
-        print(f"Error getting team projects: {e}")
+        logger.error("Error getting team projects: %s", e)
         return []
 
-def get_shared_generations(project_id: str, user_id: str) -> List[Dict]:
-    """Get shared generations for a project"""
+def get_shared_generations(project_id: str, user_id: str, limit: Optional[int] = None,
+                           before: Optional[Tuple[str, int]] = None) -> List[Dict]:
+    """Get shared generations for a project, newest first, without their payload (see get_generation_detail).
+    Pass the last row's (created_at, id) as before for the next page."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
-            
-            # Check if user has access to this project
-            cursor.execute('''
-                SELECT tm.user_id FROM team_projects p
-                JOIN team_members tm ON p.team_id = tm.team_id
-                WHERE p.project_id = ? AND tm.user_id = ? AND tm.is_active = 1
-            ''', (project_id, user_id))
-            
-            if not cursor.fetchone():
-                return []
-            
-            cursor.execute('''
-                SELECT sg.generation_id, sg.generation_data, sg.ideas_count, sg.niches_used, 
+            cursor.row_factory = sqlite3.Row
+            
+            # Keyset pagination: seek past the previous page on idx_sg_project_page instead of OFFSET.
+            # id breaks ties between rows created in the same second.
+            params = [project_id, project_id, user_id]
+            page_clause = ''
+            if before is not None:
+                page_clause = 'AND (sg.created_at, sg.id) < (?, ?)'
+                params.extend(before)
+            params.append(limit if limit is not None else -1)
+            
+            cursor.execute(f'''
+                SELECT sg.id, sg.generation_id, sg.summary, sg.ideas_count, sg.niches_used, 
                        sg.created_at, sg.likes_count, sg.comments_count,
                        u.username as creator_name
                 FROM shared_generations sg
                 JOIN auth_users u ON sg.created_by = u.user_id
                 WHERE sg.project_id = ?
-                ORDER BY sg.created_at DESC
-            ''', (project_id,))
-            
-            generations = []
-            for row in cursor.fetchall():
-                generations.append({
-                    'generation_id': row[0],
-                    'generation_data': row[1],
-                    'ideas_count': row[2],
-                    'niches_used': row[3],
-                    'created_at': row[4],
-                    'likes_count': row[5],
-                    'comments_count': row[6],
-                    'creator_name': row[7]
-                })
-            
-            return generations
+                  -- Access check in the same statement; uncorrelated, so it is evaluated once
+                  AND EXISTS (
+                      SELECT 1 FROM team_projects p
+                      JOIN team_members tm ON p.team_id = tm.team_id
+                      WHERE p.project_id = ? AND tm.user_id = ? AND tm.is_active = 1
+                  )
+                  {page_clause}
+                ORDER BY sg.created_at DESC, sg.id DESC
+                LIMIT ?
+            ''', params)
+            
+            return [dict(row) for row in cursor.fetchall()]
             
     except Exception as e:
-        print(f"Error getting shared generations: {e}")
+        logger.error("Error getting shared generations: %s", e)
         return []
 
+def get_generation_detail(generation_id: str, user_id: str) -> Optional[str]:
+    """Get a shared generation's JSON payload, or None if it doesn't exist or the user isn't in its team"""
+    try:
+        with _connect() as conn:
+            row = conn.execute('''
+                SELECT sg.generation_data FROM shared_generations sg
+                JOIN team_members tm ON tm.team_id = sg.team_id
+                WHERE sg.generation_id = ? AND tm.user_id = ? AND tm.is_active = 1
+            ''', (generation_id, user_id)).fetchone()
+        
+        return _unpack_generation_data(row[0]) if row else None
+            
+    except Exception as e:
+        logger.error("Error getting generation detail: %s", e)
+        return None
+
+# Hot-path statements, defined once so every call sends identical SQL text and reuses the
+# pooled connection's compiled statement instead of re-preparing it
+_SQL_HAS_PERMISSION = '''
+    SELECT permissions_mask FROM team_members
+    WHERE team_id = ? AND user_id = ? AND is_active = 1
+'''
+
+# Short-lived cache of membership lookups - (team_id, user_id) -> (stored_at, permission mask or None).
+# Membership checks gate most team operations, and memberships rarely change within a session.
+MEMBERSHIP_CACHE_SIZE = 4096
+MEMBERSHIP_CACHE_TTL_SECONDS = 30
+
+_membership_cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+_membership_cache_lock = threading.Lock()
+
+def _member_permissions(team_id: str, user_id: str) -> Optional[int]:
+    """Return the user's permission mask in the team (None if not a member), cached for a few seconds"""
+    key = (team_id, user_id)
+    
+    with _membership_cache_lock:
+        entry = _membership_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= MEMBERSHIP_CACHE_TTL_SECONDS:
+            _membership_cache.move_to_end(key)
+            return entry[1]
+    
+    # Errors propagate so a failed lookup is never cached
+    with _connect() as conn:
+        result = conn.execute(_SQL_HAS_PERMISSION, (team_id, user_id)).fetchone()
+    permissions = result[0] if result else None
+    
+    with _membership_cache_lock:
+        _membership_cache[key] = (time.monotonic(), permissions)
+        _membership_cache.move_to_end(key)
+        while len(_membership_cache) > MEMBERSHIP_CACHE_SIZE:
+            _membership_cache.popitem(last=False)
+    
+    return permissions
+
+def invalidate_team_cache(team_id: str, user_id: Optional[str] = None):
+    """Drop cached membership lookups for a team member, or for the whole team"""
+    with _membership_cache_lock:
+        if user_id is not None:
+            _membership_cache.pop((team_id, user_id), None)
+            return
+        for key in [key for key in _membership_cache if key[0] == team_id]:
+            del _membership_cache[key]
+
 def has_team_permission(team_id: str, user_id: str, permission: str) -> bool:
     """Check if user has specific permission in team"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT permissions FROM team_members
-                WHERE team_id = ? AND user_id = ? AND is_active = 1
-            ''', (team_id, user_id))
-            
-            result = cursor.fetchone()
-            if result:
-                permissions = result[0].split(',')
-                return permission in permissions or 'manage' in permissions
-            
+        permissions = _member_permissions(team_id, user_id)
+        if permissions is None:
             return False
+        
+        # 'manage' implies every other permission
+        return permissions & (PERMISSION_BITS.get(permission, 0) | PERMISSION_BITS['manage']) != 0
             
     except Exception as e:
-        print(f"Error checking permission: {e}")
+        logger.error("Error checking permission: %s", e)
         return False
 
 def is_team_member(team_id: str, user_id: str) -> bool:
     """Check if user is a member of the team"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id FROM team_members
-                WHERE team_id = ? AND user_id = ? AND is_active = 1
-            ''', (team_id, user_id))
-            
-            return cursor.fetchone() is not None
+        return _member_permissions(team_id, user_id) is not None
             
     except Exception as e:
-        print(f"Error checking team membership: {e}")
+        logger.error("Error checking team membership: %s", e)
         return False
 
-def log_team_activity(team_id: str, user_id: str, activity_type: str, activity_data: str = ""):
-    """Log team activity"""
+_SQL_LOG_ACTIVITY = '''
+    INSERT INTO team_activity (team_id, user_id, activity_type, activity_data)
+    VALUES (?, ?, ?, ?)
+'''
+
+# Standalone activity events are written by a background thread, many per transaction
+ACTIVITY_BATCH_SIZE = 500
+
+_activity_queue: "queue.Queue[tuple]" = queue.Queue()
+_activity_worker_thread: Optional[threading.Thread] = None
+_activity_worker_lock = threading.Lock()
+
+def _activity_worker():
+    """Drain queued activity events into team_activity, one executemany/commit per batch"""
+    while True:
+        events = [_activity_queue.get()]
+        while len(events) < ACTIVITY_BATCH_SIZE:
+            try:
+                events.append(_activity_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        try:
+            with _connect() as conn:
+                conn.executemany(_SQL_LOG_ACTIVITY, events)
+        except Exception as e:
+            logger.error("Error logging activity: %s", e)
+        finally:
+            for _ in events:
+                _activity_queue.task_done()
+
+def _ensure_activity_worker():
+    """Start the activity writer thread on first use"""
+    global _activity_worker_thread
+    
+    with _activity_worker_lock:
+        if _activity_worker_thread is None:
+            _activity_worker_thread = threading.Thread(target=_activity_worker, name="team-activity-writer", daemon=True)
+            _activity_worker_thread.start()
+
+def log_team_activity(team_id: str, user_id: str, activity_type: str, activity_data: str = "",
+                      conn: Optional[sqlite3.Connection] = None):
+    """Log team activity (pass conn to record it inside the caller's open transaction, otherwise it is queued)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO team_activity (team_id, user_id, activity_type, activity_data)
-                VALUES (?, ?, ?, ?)
-            ''', (team_id, user_id, activity_type, activity_data))
-            
-            conn.commit()
+        if conn is not None:
+            # Same connection as the caller's write - a second connection would wait on its lock
+            conn.execute(_SQL_LOG_ACTIVITY, (team_id, user_id, activity_type, activity_data))
+            return
+        
+        # Fire-and-forget: the caller doesn't wait for a commit
+        _ensure_activity_worker()
+        _activity_queue.put((team_id, user_id, activity_type, activity_data))
             
     except Exception as e:
-        print(f"Error logging activity: {e}")
+        logger.error("Error logging activity: %s", e)
 
-def get_team_activity(team_id: str, limit: int = 20) -> List[Dict]:
-    """Get recent team activity"""
+def flush_team_activity():
+    """Block until every queued activity event has been written (registered to run at interpreter exit)"""
+    _activity_queue.join()
+
+atexit.register(flush_team_activity)
+
+def get_team_activity(team_id: str, limit: int = 20, before: Optional[Tuple[str, int]] = None) -> List[Dict]:
+    """Get recent team activity (pass the last row's (created_at, id) as before for the next page)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT ta.activity_type, ta.activity_data, ta.created_at, u.username
+            cursor.row_factory = sqlite3.Row
+            
+            # Keyset pagination on idx_ta_team_page, same scheme as get_shared_generations
+            params = [team_id]
+            page_clause = ''
+            if before is not None:
+                page_clause = 'AND (ta.created_at, ta.id) < (?, ?)'
+                params.extend(before)
+            params.append(limit)
+            
+            cursor.execute(f'''
+                SELECT ta.id, ta.activity_type, ta.activity_data, ta.created_at, u.username
                 FROM team_activity ta
                 JOIN auth_users u ON ta.user_id = u.user_id
-                WHERE ta.team_id = ?
-                ORDER BY ta.created_at DESC
+                WHERE ta.team_id = ? {page_clause}
+                ORDER BY ta.created_at DESC, ta.id DESC
                 LIMIT ?
-            ''', (team_id, limit))
-            
-            activities = []
-            for row in cursor.fetchall():
-                activities.append({
-                    'activity_type': row[0],
-                    'activity_data': row[1],
-                    'created_at': row[2],
-                    'username': row[3]
-                })
+            ''', params)
             
-            return activities
+            cursor.arraysize = limit
+            return [dict(row) for row in cursor.fetchmany(limit)]
             
     except Exception as e:
-        print(f"Error getting team activity: {e}")
+        logger.error("Error getting team activity: %s", e)
         return []
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     setup_team_database()
     print("✅ Team collaboration system ready!")
\ No newline at end of file
@@ -7,7 +7,14 @@ Production-ready team interface with modern design
 import streamlit as st
 import json
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+# Fast JSON parsing/serialization (optional - falls back to the stdlib json module)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 from team_collaboration import (
     setup_team_database,
     create_team,
@@ -18,12 +25,113 @@ from team_collaboration import (
     get_user_teams,
     get_team_projects,
     get_shared_generations,
+    get_generation_detail,
     has_team_permission,
     get_team_activity
 )
 
+# Idea titles shown in the shared-generation list before the full ideas are opened
+SUMMARY_TITLES = 3
+
+# Shared-ideas paging - generations listed per "Load more" step, ideas shown before "Show all"
+GENERATIONS_PAGE_SIZE = 5
+IDEAS_PREVIEW_COUNT = 3
+
+def _json_loads(text):
+    """Parse JSON text, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _json_dumps(data) -> str:
+    """Serialize shared ideas to a pretty-printed, non-ASCII-escaped JSON string"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=4, ensure_ascii=False)
+
+# Dashboard sections rerun on their own when their widgets change (st.fragment, Streamlit 1.37+;
+# experimental_fragment on 1.33-1.36). Older versions just rerun the whole script as before.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# Activity feed icon per activity type
+ACTIVITY_ICONS = {
+    'team_created': "🎉",
+    'member_joined': "👋",
+    'member_invited': "📧",
+    'project_created': "📁",
+    'generation_shared': "💡",
+}
+DEFAULT_ACTIVITY_ICON = "🔵"
+
+# Session keys the team UI reads, initialised once per session by _init_team_state
+TEAM_STATE_DEFAULTS = {
+    'show_create_team': False,
+    'show_join_team': False,
+    'show_create_project': False,
+    'show_project_detail': False,
+    'selected_team': None,
+    'selected_project': None,
+}
+
+def _init_team_state():
+    """Seed the team UI's session keys so the views can index them directly"""
+    for key, value in TEAM_STATE_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
+
+# Team reads memoized across reruns (widget interactions rerun the whole page);
+# every team mutation below clears them through _clear_team_caches
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_user_teams(user_id: str) -> List[Dict]:
+    """get_user_teams memoized across reruns"""
+    return get_user_teams(user_id)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_team_projects(team_id: str, user_id: str) -> List[Dict]:
+    """get_team_projects memoized across reruns"""
+    return get_team_projects(team_id, user_id)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_shared_generations(project_id: str, user_id: str, limit: int) -> List[Dict]:
+    """get_shared_generations memoized across reruns"""
+    return get_shared_generations(project_id, user_id, limit)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_team_activity(team_id: str) -> List[Dict]:
+    """get_team_activity memoized across reruns"""
+    return get_team_activity(team_id)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def _cached_generation_ideas(generation_id: str, user_id: str) -> Optional[List[Dict]]:
+    """Fetch, decompress and parse a shared generation once - its payload never changes after sharing"""
+    generation_data = get_generation_detail(generation_id, user_id)
+    if generation_data is None:
+        return None
+    return _json_loads(generation_data)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _team_options(user_id: str) -> Tuple[Tuple[str, ...], Dict[str, str]]:
+    """Selectbox options for the user's teams: (team ids, id -> name)"""
+    teams = _cached_user_teams(user_id)
+    return tuple(team['team_id'] for team in teams), {team['team_id']: team['team_name'] for team in teams}
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _project_options(team_id: str, user_id: str) -> Tuple[Tuple[str, ...], Dict[str, str]]:
+    """Selectbox options for a team's projects: (project ids, id -> name)"""
+    projects = _cached_team_projects(team_id, user_id)
+    return tuple(p['project_id'] for p in projects), {p['project_id']: p['project_name'] for p in projects}
+
+def _clear_team_caches():
+    """Drop the memoized team reads after a change so the next rerun shows it"""
+    _cached_user_teams.clear()
+    _cached_team_projects.clear()
+    _cached_shared_generations.clear()
+    _cached_team_activity.clear()
+    _team_options.clear()
+    _project_options.clear()
+
 def show_teams_interface():
     """Main teams interface"""
+    _init_team_state()
     st.sidebar.markdown("---")
     st.sidebar.subheader("👥 Teams")
     
@@ -32,7 +140,7 @@ def show_teams_interface():
         return
     
     user_id = st.session_state.get('user_id')
-    teams = get_user_teams(user_id)
+    teams = _cached_user_teams(user_id)
     
     # Team selector in sidebar
     if teams:
@@ -45,7 +153,10 @@ def show_teams_interface():
         )
         
         if selected_team_idx is not None:
-            st.session_state.selected_team = teams[selected_team_idx]
+            # Permissions as a frozenset for the per-tab 'x in permissions' checks
+            team = dict(teams[selected_team_idx])
+            team['permissions'] = frozenset(team['permissions'])
+            st.session_state.selected_team = team
             
         if st.sidebar.button("➕ Create New Team"):
             st.session_state.show_create_team = True
@@ -62,7 +173,8 @@ def show_teams_interface():
 
 def show_create_team_modal():
     """Team creation modal"""
-    if not st.session_state.get('show_create_team', False):
+    _init_team_state()
+    if not st.session_state.show_create_team:
         return
         
     st.markdown("## 🆕 Create New Team")
@@ -92,6 +204,7 @@ def show_create_team_modal():
                 )
                 
                 if success:
+                    _clear_team_caches()
                     st.success(message)
                     st.session_state.show_create_team = False
                     st.rerun()
@@ -102,7 +215,8 @@ def show_create_team_modal():
 
 def show_join_team_modal():
     """Team joining modal"""
-    if not st.session_state.get('show_join_team', False):
+    _init_team_state()
+    if not st.session_state.show_join_team:
         return
         
     st.markdown("## 📧 Join Team")
@@ -125,6 +239,7 @@ def show_join_team_modal():
                 success, message = accept_team_invitation(invitation_token, st.session_state.user_id)
                 
                 if success:
+                    _clear_team_caches()
                     st.success(message)
                     st.session_state.show_join_team = False
                     st.rerun()
@@ -135,7 +250,8 @@ def show_join_team_modal():
 
 def show_team_dashboard():
     """Main team dashboard"""
-    if not st.session_state.get('selected_team'):
+    _init_team_state()
+    if not st.session_state.selected_team:
         st.info("👥 **Welcome to Team Collaboration!**")
         st.markdown("""
         ### 🚀 Get Started:
@@ -173,36 +289,25 @@ def show_team_dashboard():
         else:
             st.metric("Status", "Member")
     
-    # Tab navigation
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📁 Projects", "💡 Shared Ideas", "👥 Members", "📊 Activity", "⚙️ Settings"])
-    
-    with tab1:
-        show_projects_tab(team)
-    
-    with tab2:
-        show_shared_ideas_tab(team)
-    
-    with tab3:
-        show_members_tab(team)
-    
-    with tab4:
-        show_activity_tab(team)
-    
-    with tab5:
-        show_settings_tab(team)
+    # Section navigation - st.tabs would build every tab's body (and run its queries) on each
+    # rerun, so only the selected section is rendered
+    section = st.radio("Section", list(TEAM_SECTIONS), horizontal=True,
+                       label_visibility="collapsed", key="team_section")
+    TEAM_SECTIONS[section](team)
 
+@_fragment
 def show_projects_tab(team: Dict):
     """Projects tab content"""
     st.subheader("📁 Team Projects")
     
-    projects = get_team_projects(team['team_id'], st.session_state.user_id)
+    projects = _cached_team_projects(team['team_id'], st.session_state.user_id)
     
     # Create new project button
     if 'write' in team['permissions']:
         if st.button("➕ Create New Project"):
             st.session_state.show_create_project = True
     
-    if st.session_state.get('show_create_project', False):
+    if st.session_state.show_create_project:
         show_create_project_form(team)
     
     # Display projects
@@ -212,18 +317,20 @@ def show_projects_tab(team: Dict):
                 col1, col2 = st.columns([3, 1])
                 
                 with col1:
+                    # One markdown element per project
+                    details = []
                     if project['description']:
-                        st.write(f"**Description:** {project['description']}")
-                    st.write(f"**Created by:** {project['creator_name']}")
-                    st.write(f"**Created:** {project['created_at'][:10]}")
+                        details.append(f"**Description:** {project['description']}")
+                    details.append(f"**Created by:** {project['creator_name']}")
+                    details.append(f"**Created:** {project['created_at'][:10]}")
                     if project['niches']:
-                        st.write(f"**Niches:** {project['niches']}")
+                        details.append(f"**Niches:** {project['niches']}")
+                    st.markdown("\n\n".join(details))
                 
                 with col2:
                     st.metric("Shared Ideas", project['generation_count'])
                     if st.button(f"🔗 Open", key=f"open_project_{project['project_id']}"):
-                        st.session_state.selected_project = project
-                        st.session_state.show_project_detail = True
+                        st.session_state.update(selected_project=project, show_project_detail=True)
     else:
         st.info("No projects yet. Create your first project to start collaborating!")
 
@@ -257,6 +364,7 @@ def show_create_project_form(team: Dict):
                 )
                 
                 if success:
+                    _clear_team_caches()
                     st.success(message)
                     st.session_state.show_create_project = False
                     st.rerun()
@@ -265,66 +373,62 @@ def show_create_project_form(team: Dict):
             else:
                 st.error("Project name is required")
 
+@_fragment
 def show_shared_ideas_tab(team: Dict):
     """Shared ideas tab content"""
-    st.subheader("💡 Shared Content Ideas")
-    
-    projects = get_team_projects(team['team_id'], st.session_state.user_id)
+    project_ids, project_names = _project_options(team['team_id'], st.session_state.user_id)
     
-    if not projects:
+    # Empty state: just the hint, nothing else is built
+    if not project_ids:
         st.info("Create a project first to share content ideas")
         return
     
+    st.subheader("💡 Shared Content Ideas")
+    
     # Project selector for viewing shared ideas
-    project_names = {p['project_id']: p['project_name'] for p in projects}
     selected_project_id = st.selectbox(
         "Select Project",
-        list(project_names.keys()),
-        format_func=lambda x: project_names[x],
+        project_ids,
+        format_func=project_names.get,
         key="shared_ideas_project_selector"
     )
     
     if selected_project_id:
-        shared_generations = get_shared_generations(selected_project_id, st.session_state.user_id)
+        # Only the first pages are rendered; one extra row tells whether "Load more" is needed
+        page_key = f"ideas_page_{selected_project_id}"
+        page_size = st.session_state.setdefault(page_key, GENERATIONS_PAGE_SIZE)
+        shared_generations = _cached_shared_generations(selected_project_id, st.session_state.user_id, page_size + 1)
+        has_more = len(shared_generations) > page_size
         
         if shared_generations:
-            for generation in shared_generations:
+            for generation in shared_generations[:page_size]:
+                generation_id = generation['generation_id']
                 with st.expander(f"💡 {generation['ideas_count']} Ideas by {generation['creator_name']}", expanded=False):
-                    st.write(f"**Created:** {generation['created_at'][:16]}")
-                    st.write(f"**Niches:** {generation['niches_used']}")
+                    details = [f"**Created:** {generation['created_at'][:16]}", f"**Niches:** {generation['niches_used']}"]
+                    if generation['summary']:
+                        details.append(f"**Ideas:** {generation['summary']}")
+                    st.markdown("\n\n".join(details))
                     
-                    # Show the actual ideas
-                    try:
-                        ideas_data = json.loads(generation['generation_data'])
-                        for i, idea in enumerate(ideas_data, 1):
-                            st.markdown(f"**Idea {i}: {idea.get('title', 'No title')}**")
-                            st.write(f"📝 {idea.get('caption_hook', 'No caption')}")
-                            
-                            # Show video and audio scripts in collapsible sections
-                            if idea.get('video_script'):
-                                with st.expander(f"🎬 Video Script {i}"):
-                                    st.write(idea['video_script'])
-                            
-                            if idea.get('full_audio_script'):
-                                with st.expander(f"🎙️ Audio Script {i}"):
-                                    st.write(idea['full_audio_script'])
-                            
-                            st.markdown("---")
-                            
-                    except json.JSONDecodeError:
-                        st.error("Could not parse idea data")
+                    # The full payload is only fetched and decompressed when asked for
+                    if st.checkbox("Show ideas", key=f"show_{generation_id}"):
+                        _show_shared_ideas(generation_id)
                     
                     # Interaction buttons
                     col1, col2, col3 = st.columns(3)
                     with col1:
-                        st.button(f"👍 Like ({generation['likes_count']})", key=f"like_{generation['generation_id']}")
+                        st.button(f"👍 Like ({generation['likes_count']})", key=f"like_{generation_id}")
                     with col2:
-                        st.button(f"💬 Comment ({generation['comments_count']})", key=f"comment_{generation['generation_id']}")
+                        st.button(f"💬 Comment ({generation['comments_count']})", key=f"comment_{generation_id}")
                     with col3:
-                        st.button("📋 Copy All", key=f"copy_{generation['generation_id']}")
+                        st.button("📋 Copy All", key=f"copy_{generation_id}")
+            
+            if has_more and st.button(f"⬇️ Load {GENERATIONS_PAGE_SIZE} more", key=f"more_{selected_project_id}"):
+                st.session_state[page_key] = page_size + GENERATIONS_PAGE_SIZE
+                st.rerun()
         else:
             st.info("No shared ideas in this project yet")
 
+@_fragment
 def show_members_tab(team: Dict):
     """Members tab content"""
     st.subheader("👥 Team Members")
@@ -341,6 +445,7 @@ def show_members_tab(team: Dict):
                     if email:
                         success, message = invite_team_member(team['team_id'], st.session_state.user_id, email, role)
                         if success:
+                            _clear_team_caches()
                             st.success(message)
                         else:
                             st.error(message)
@@ -350,33 +455,24 @@ def show_members_tab(team: Dict):
     # TODO: Display actual team members (would need additional query)
     st.info("Member list will show existing team members with their roles and permissions")
 
+@_fragment
 def show_activity_tab(team: Dict):
     """Activity tab content"""
     st.subheader("📊 Team Activity")
     
-    activities = get_team_activity(team['team_id'])
+    activities = _cached_team_activity(team['team_id'])
     
     if activities:
-        for activity in activities:
-            # Format activity based on type
-            icon = "🔵"
-            if activity['activity_type'] == 'team_created':
-                icon = "🎉"
-            elif activity['activity_type'] == 'member_joined':
-                icon = "👋"
-            elif activity['activity_type'] == 'member_invited':
-                icon = "📧"
-            elif activity['activity_type'] == 'project_created':
-                icon = "📁"
-            elif activity['activity_type'] == 'generation_shared':
-                icon = "💡"
-            
-            st.markdown(f"{icon} **{activity['username']}** {activity['activity_data']}")
-            st.caption(f"📅 {activity['created_at'][:16]}")
-            st.markdown("---")
+        # One markdown element for the whole feed instead of three per activity
+        st.markdown("\n\n---\n\n".join(
+            f"{ACTIVITY_ICONS.get(activity['activity_type'], DEFAULT_ACTIVITY_ICON)} **{activity['username']}** {activity['activity_data']}  \n"
+            f"_📅 {activity['created_at'][:16]}_"
+            for activity in activities
+        ))
     else:
         st.info("No activity yet")
 
+@_fragment
 def show_settings_tab(team: Dict):
     """Settings tab content"""
     st.subheader("⚙️ Team Settings")
@@ -386,12 +482,14 @@ def show_settings_tab(team: Dict):
         
         # Team info editing
         with st.expander("✏️ Edit Team Info"):
-            new_name = st.text_input("Team Name", value=team['team_name'])
-            new_description = st.text_area("Description", value=team.get('description', ''))
-            
-            if st.button("💾 Save Changes"):
-                # TODO: Implement team info update
-                st.success("Team info updated!")
+            # One form so typing in the fields doesn't rerun the page until Save is pressed
+            with st.form("edit_team_form"):
+                new_name = st.text_input("Team Name", value=team['team_name'])
+                new_description = st.text_area("Description", value=team.get('description', ''))
+                
+                if st.form_submit_button("💾 Save Changes"):
+                    # TODO: Implement team info update
+                    st.success("Team info updated!")
         
         # Danger zone
         with st.expander("⚠️ Danger Zone", expanded=False):
@@ -410,39 +508,79 @@ def show_settings_tab(team: Dict):
     st.markdown("### ℹ️ Team Information")
     st.write(f"**Team ID:** `{team['team_id']}`")
     st.write(f"**Your Role:** {team['role']}")
-    st.write(f"**Your Permissions:** {', '.join(team['permissions'])}")
+    st.write(f"**Your Permissions:** {', '.join(sorted(team['permissions']))}")
+
+# Team dashboard sections, in navigation order
+TEAM_SECTIONS = {
+    "📁 Projects": show_projects_tab,
+    "💡 Shared Ideas": show_shared_ideas_tab,
+    "👥 Members": show_members_tab,
+    "📊 Activity": show_activity_tab,
+    "⚙️ Settings": show_settings_tab,
+}
 
-def add_team_share_button(ideas_data: str, ideas_count: int, niches_used: str):
-    """Add team sharing functionality to main content generator"""
+def _show_shared_ideas(generation_id: str):
+    """Render the ideas of one shared generation"""
+    try:
+        ideas_data = _cached_generation_ideas(generation_id, st.session_state.user_id)
+        if ideas_data is None:
+            st.error("Could not load idea data")
+            return
+        
+        show_all = (len(ideas_data) <= IDEAS_PREVIEW_COUNT
+                    or st.checkbox(f"Show all {len(ideas_data)} ideas", key=f"expand_{generation_id}"))
+        visible_ideas = ideas_data if show_all else ideas_data[:IDEAS_PREVIEW_COUNT]
+        
+        for i, idea in enumerate(visible_ideas, 1):
+            st.markdown(f"**Idea {i}: {idea.get('title', 'No title')}**")
+            st.write(f"📝 {idea.get('caption_hook', 'No caption')}")
+            
+            # Scripts in tabs - this already renders inside the generation's expander, which can't nest another
+            scripts = {}
+            if idea.get('video_script'):
+                scripts[f"🎬 Video Script {i}"] = idea['video_script']
+            if idea.get('full_audio_script'):
+                scripts[f"🎙️ Audio Script {i}"] = idea['full_audio_script']
+            
+            if scripts:
+                for tab, script in zip(st.tabs(list(scripts)), scripts.values()):
+                    with tab:
+                        st.write(script)
+            
+            st.markdown("---")
+            
+    except json.JSONDecodeError:
+        st.error("Could not parse idea data")
+
+def add_team_share_button(ideas: List[Dict], ideas_count: int, niches_used: str):
+    """Add team sharing functionality to main content generator (ideas are serialized only when shared)"""
     if not st.session_state.get('authenticated', False):
         return
     
-    user_teams = get_user_teams(st.session_state.user_id)
+    team_ids, team_names = _team_options(st.session_state.user_id)
     
-    if not user_teams:
+    if not team_ids:
         return
     
     st.markdown("---")
     st.subheader("👥 Share with Team")
     
     # Team and project selection
-    team_options = {team['team_id']: team['team_name'] for team in user_teams}
     selected_team_id = st.selectbox(
         "Select Team",
-        list(team_options.keys()),
-        format_func=lambda x: team_options[x],
+        team_ids,
+        format_func=team_names.get,
         key="share_team_selector"
     )
     
     if selected_team_id:
-        projects = get_team_projects(selected_team_id, st.session_state.user_id)
+        project_ids, project_names = _project_options(selected_team_id, st.session_state.user_id)
         
-        if projects:
-            project_options = {p['project_id']: p['project_name'] for p in projects}
+        if project_ids:
             selected_project_id = st.selectbox(
                 "Select Project",
-                list(project_options.keys()),
-                format_func=lambda x: project_options[x],
+                project_ids,
+                format_func=project_names.get,
                 key="share_project_selector"
             )
             
@@ -451,12 +589,14 @@ def add_team_share_button(ideas_data: str, ideas_count: int, niches_used: str):
                     selected_team_id,
                     selected_project_id,
                     st.session_state.user_id,
-                    ideas_data,
+                    _json_dumps(ideas),
                     ideas_count,
-                    niches_used
+                    niches_used,
+                    summary=" · ".join(idea.get('title', 'No title') for idea in ideas[:SUMMARY_TITLES])
                 )
                 
                 if success:
+                    _clear_team_caches()
                     st.success(message)
                 else:
                     st.error(message)
@@ -464,11 +604,8 @@ def add_team_share_button(ideas_data: str, ideas_count: int, niches_used: str):
             st.info("Create a project first to share content")
 
 # Initialize team system
+@st.cache_resource(show_spinner=False)
 def initialize_team_system():
-    """Initialize the team collaboration system"""
-    try:
-        setup_team_database()
-        return True
-    except Exception as e:
-        st.error(f"Failed to initialize team system: {e}")
-        return False
\ No newline at end of file
+    """Initialize the team collaboration system once per server process"""
+    setup_team_database()
+    return True
\ No newline at end of file
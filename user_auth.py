@@ -4,68 +4,189 @@ Simple User Authentication System for Content Generator
 Lightweight login system that works with the existing db_manager
 """
 
-import sqlite3
 import hashlib
+import hmac
 import uuid
 import os
 import secrets
 import re
-from datetime import datetime, timedelta
-from typing import Optional, Tuple
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from db_pool import get_conn
 
 # Database path
 DB_NAME = 'content_tracker_users_niche.db'
 DB_PATH = os.path.join(os.path.dirname(__file__), DB_NAME)
 
+def _connect():
+    """Borrow a pooled connection to the auth database (WAL and tuned pragmas applied by db_pool)"""
+    return get_conn(DB_PATH)
+
 # Security constants
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION = 30  # minutes
+LAST_LOGIN_REFRESH_SECONDS = 60  # Logins closer together than this don't rewrite last_login
+SESSION_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 day expiry
+RECENT_STATS_SECONDS = 7 * 24 * 60 * 60  # get_user_stats 'recent' window
+PBKDF2_ITERATIONS = 100000
+MAX_INPUT_LENGTH = 100  # sanitize_input keeps at most this many characters
+
+# Validation patterns, compiled once
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+_NON_SPACE_RE = re.compile(r'\S')  # \s matches exactly what str.strip() removes
+
+# Character classes for the password strength check (ASCII, like the patterns they replaced)
+_UPPERCASE = frozenset(string.ascii_uppercase)
+_LOWERCASE = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
 def validate_password_strength(password: str) -> Tuple[bool, str]:
     """Validate password strength"""
     if len(password) < 8:
         return False, "Password must be at least 8 characters long"
     
-    if not re.search(r'[A-Z]', password):
+    # One pass over the password to collect its characters, then three small set checks
+    chars = set(password)
+    
+    if chars.isdisjoint(_UPPERCASE):
         return False, "Password must contain at least one uppercase letter"
     
-    if not re.search(r'[a-z]', password):
+    if chars.isdisjoint(_LOWERCASE):
         return False, "Password must contain at least one lowercase letter"
     
-    if not re.search(r'[0-9]', password):
+    if chars.isdisjoint(_DIGITS):
         return False, "Password must contain at least one number"
     
     return True, "Password is strong"
 
 def sanitize_input(text: str) -> str:
     """Sanitize user input"""
-    return text.strip()[:100]  # Limit length and remove whitespace
+    if not isinstance(text, str):
+        return ''
+    # Same result as text.strip()[:100] (strip, then limit length) without copying huge inputs:
+    # only the 100 characters after the leading whitespace are sliced out
+    first = _NON_SPACE_RE.search(text)
+    if first is None:
+        return ''
+    start = first.start()
+    head = text[start:start + MAX_INPUT_LENGTH]
+    if len(head) == MAX_INPUT_LENGTH and _NON_SPACE_RE.search(text, start + MAX_INPUT_LENGTH):
+        return head  # More text follows, so the full strip wouldn't have touched the end of head
+    return head.rstrip()
+
+def _pbkdf2(password: str, salt: bytes) -> bytes:
+    """PBKDF2-HMAC-SHA256 of the password (hashlib runs this in OpenSSL, which uses SHA extensions where present)"""
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PBKDF2_ITERATIONS)
 
-def hash_password(password: str) -> str:
-    """Create a secure hash of the password using PBKDF2"""
-    salt = secrets.token_bytes(32)  # 256-bit salt
-    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    return salt.hex() + ':' + password_hash.hex()
+SALT_BYTES = 16  # 128-bit salt, stored ahead of the derived key in one BLOB
 
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
+def hash_password(password: str) -> bytes:
+    """Create a secure hash of the password using PBKDF2 (salt + derived key as raw bytes)"""
+    salt = secrets.token_bytes(SALT_BYTES)
+    return salt + _pbkdf2(password, salt)
+
+def verify_password(password: str, hashed) -> bool:
+    """Verify password against hash (raw salt + key, or the older 'salt_hex:hash_hex' text)"""
     try:
-        salt_hex, hash_hex = hashed.split(':')
-        salt = bytes.fromhex(salt_hex)
-        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-        return password_hash.hex() == hash_hex
+        if isinstance(hashed, bytes):
+            salt, expected = hashed[:SALT_BYTES], hashed[SALT_BYTES:]
+        else:
+            salt_hex, hash_hex = hashed.split(':')
+            salt, expected = bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
+        if len(expected) != hashlib.sha256().digest_size:
+            return False  # Malformed stored hash - skip the 100k-iteration derivation
+        return hmac.compare_digest(_pbkdf2(password, salt), expected)
     except ValueError:
         return False
 
+def verify_passwords_batch(passwords: Sequence[str], hashes: Sequence, max_workers: Optional[int] = None) -> List[bool]:
+    """Verify many password/hash pairs in parallel (pbkdf2_hmac releases the GIL, so threads scale across cores)"""
+    if len(passwords) != len(hashes):
+        raise ValueError("passwords and hashes must be the same length")
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(), thread_name_prefix="pbkdf2") as executor:
+        return list(executor.map(verify_password, passwords, hashes))
+
+# Table templates shared by setup_auth_database and _migrate_epoch_columns
+# (expires_at / generation_date are Unix epoch seconds: compact, and compared as integers)
+_SQL_CREATE_USER_SESSIONS = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        session_id TEXT UNIQUE NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        expires_at INTEGER NOT NULL,
+        is_active INTEGER DEFAULT 1,
+        FOREIGN KEY (user_id) REFERENCES auth_users (user_id)
+    )
+'''
+
+_SQL_CREATE_GENERATION_STATS = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        generation_date INTEGER NOT NULL,
+        ideas_generated INTEGER DEFAULT 0,
+        niches_used TEXT,
+        session_id TEXT,
+        FOREIGN KEY (user_id) REFERENCES auth_users (user_id)
+    )
+'''
+
+# Tables whose timestamp column moved from an ISO string to epoch seconds: (table, column, template, columns)
+_EPOCH_COLUMNS = (
+    ('user_sessions', 'expires_at', _SQL_CREATE_USER_SESSIONS,
+     ('id', 'user_id', 'session_id', 'created_at', 'expires_at', 'is_active')),
+    ('user_generation_stats', 'generation_date', _SQL_CREATE_GENERATION_STATS,
+     ('id', 'user_id', 'generation_date', 'ideas_generated', 'niches_used', 'session_id')),
+)
+
+def _migrate_epoch_columns(cursor):
+    """Rebuild session / stats tables created when their timestamps were ISO strings"""
+    for table, column, create_sql, columns in _EPOCH_COLUMNS:
+        cursor.execute(f"PRAGMA table_info({table})")
+        column_types = {row[1]: row[2].upper() for row in cursor.fetchall()}
+        if column_types.get(column) == 'INTEGER':
+            continue
+        
+        # Old values are local-time isoformat() strings; rows of users that no longer exist are dropped
+        # since the rebuilt table enforces the auth_users reference
+        select_list = ', '.join(
+            f"COALESCE(CAST(strftime('%s', {col}, 'utc') AS INTEGER), 0)" if col == column else col
+            for col in columns
+        )
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(create_sql.format(table=f'{table}_migrated'))
+        cursor.execute(f'''
+            INSERT INTO {table}_migrated ({', '.join(columns)})
+            SELECT {select_list} FROM {table}
+            WHERE user_id IN (SELECT user_id FROM auth_users)
+        ''')
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {table}_migrated RENAME TO {table}')
+        cursor.connection.commit()
+
+# Secondary indexes created by setup_auth_database (username, email and session_id are UNIQUE already)
+AUTH_INDEXES = (
+    # create_session: deactivate the user's open sessions
+    'CREATE INDEX IF NOT EXISTS idx_sessions_user_active ON user_sessions(user_id, is_active)',
+    # get_user_stats: totals and the 7-day window, covering ideas_generated
+    'CREATE INDEX IF NOT EXISTS idx_stats_user_date ON user_generation_stats(user_id, generation_date, ideas_generated)',
+)
+
 def setup_auth_database():
     """Initialize the authentication database"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
             # Create users table
@@ -75,38 +196,20 @@ def setup_auth_database():
                     user_id TEXT UNIQUE NOT NULL,
                     username TEXT UNIQUE NOT NULL,
                     email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
+                    password_hash BLOB NOT NULL,
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     last_login TEXT,
                     is_active INTEGER DEFAULT 1
                 )
             ''')
             
-            # Create sessions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    session_id TEXT UNIQUE NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TEXT NOT NULL,
-                    is_active INTEGER DEFAULT 1,
-                    FOREIGN KEY (user_id) REFERENCES auth_users (user_id)
-                )
-            ''')
+            # Sessions and generation stats keep their timestamps as Unix epoch seconds
+            cursor.execute(_SQL_CREATE_USER_SESSIONS.format(table='user_sessions'))
+            cursor.execute(_SQL_CREATE_GENERATION_STATS.format(table='user_generation_stats'))
+            _migrate_epoch_columns(cursor)
             
-            # Create user stats table for tracking generation history
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_generation_stats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    generation_date TEXT NOT NULL,
-                    ideas_generated INTEGER DEFAULT 0,
-                    niches_used TEXT,
-                    session_id TEXT,
-                    FOREIGN KEY (user_id) REFERENCES auth_users (user_id)
-                )
-            ''')
+            for index_sql in AUTH_INDEXES:
+                cursor.execute(index_sql)
             
             conn.commit()
             
@@ -127,7 +230,7 @@ def create_user(username: str, email: str, password: str) -> Tuple[bool, str, Op
         if len(username) > 30:
             return False, "Username must be less than 30 characters", None
             
-        if not re.match(r'^[a-zA-Z0-9_-]+$', username):
+        if not _USERNAME_RE.match(username):
             return False, "Username can only contain letters, numbers, hyphens, and underscores", None
             
         if not validate_email(email):
@@ -137,23 +240,19 @@ def create_user(username: str, email: str, password: str) -> Tuple[bool, str, Op
         if not password_valid:
             return False, password_message, None
             
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
-            # Check if username or email already exists
-            cursor.execute('SELECT username, email FROM auth_users WHERE username = ? OR email = ?', (username, email))
-            existing = cursor.fetchone()
-            if existing:
-                return False, "Username or email already exists", None
-            
-            # Create user
-            user_id = str(uuid.uuid4())
+            # Create user - the UNIQUE username/email constraints reject duplicates in the same statement
+            user_id = uuid.uuid4().hex
             password_hash = hash_password(password)
             
             cursor.execute('''
-                INSERT INTO auth_users (user_id, username, email, password_hash)
+                INSERT OR IGNORE INTO auth_users (user_id, username, email, password_hash)
                 VALUES (?, ?, ?, ?)
             ''', (user_id, username, email, password_hash))
+            if cursor.rowcount == 0:
+                return False, "Username or email already exists", None
             
             conn.commit()
             return True, f"Account created successfully for {username}!", user_id
@@ -161,15 +260,24 @@ def create_user(username: str, email: str, password: str) -> Tuple[bool, str, Op
     except Exception as e:
         return False, f"Error creating account: {str(e)}", None
 
+def _logged_in_recently(last_login: Optional[str], now: datetime) -> bool:
+    """True if the stored last_login is less than LAST_LOGIN_REFRESH_SECONDS before now"""
+    if not last_login:
+        return False
+    try:
+        return 0 <= (now - datetime.fromisoformat(last_login)).total_seconds() < LAST_LOGIN_REFRESH_SECONDS
+    except ValueError:
+        return False
+
 def authenticate_user(username: str, password: str) -> Tuple[bool, str, Optional[str]]:
     """Authenticate user login"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
             # Get user and password hash
             cursor.execute('''
-                SELECT user_id, username, is_active, password_hash FROM auth_users 
+                SELECT user_id, username, is_active, password_hash, last_login FROM auth_users 
                 WHERE username = ?
             ''', (username,))
             
@@ -177,7 +285,7 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, str, Optional
             if not user:
                 return False, "Invalid username or password", None
             
-            user_id, username, is_active, stored_hash = user
+            user_id, username, is_active, stored_hash, last_login = user
             
             if not is_active:
                 return False, "Account is deactivated", None
@@ -186,27 +294,55 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, str, Optional
             if not verify_password(password, stored_hash):
                 return False, "Invalid username or password", None
             
-            # Update last login
-            cursor.execute('UPDATE auth_users SET last_login = ? WHERE user_id = ?', 
-                         (datetime.now().isoformat(), user_id))
-            
-            conn.commit()
+            # Update last login, moving hashes still in the old hex text format to raw bytes
+            now = datetime.now()
+            login_at = now.isoformat(timespec='seconds')  # Formatted once, local time like the stored values
+            if not isinstance(stored_hash, bytes):
+                cursor.execute('UPDATE auth_users SET last_login = ?, password_hash = ? WHERE user_id = ?', 
+                             (login_at, hash_password(password), user_id))
+            elif not _logged_in_recently(last_login, now):
+                cursor.execute('UPDATE auth_users SET last_login = ? WHERE user_id = ?', 
+                             (login_at, user_id))
+            
+            conn.commit()  # No-op when the last_login write was skipped
             return True, f"Welcome back, {username}!", user_id
             
     except Exception as e:
         return False, f"Login error: {str(e)}", None
 
+# In-process cache of verified sessions: session_id -> (user_id, username, expires_at), FIFO-evicted
+SESSION_CACHE_SIZE = 4096
+_session_cache: Dict[str, Tuple[str, str, int]] = {}
+_session_cache_lock = threading.Lock()
+
+def _cache_session(session_id: str, user_id: str, username: str, expires_at: int):
+    """Remember a verified session, evicting the oldest entries past SESSION_CACHE_SIZE"""
+    with _session_cache_lock:
+        _session_cache[session_id] = (user_id, username, expires_at)
+        while len(_session_cache) > SESSION_CACHE_SIZE:
+            del _session_cache[next(iter(_session_cache))]
+
+def _forget_user_sessions(user_id: str):
+    """Drop every cached session of a user (their sessions were just deactivated)"""
+    with _session_cache_lock:
+        for session_id in [sid for sid, entry in _session_cache.items() if entry[0] == user_id]:
+            del _session_cache[session_id]
+
 def create_session(user_id: str) -> str:
     """Create a new session for the user"""
     try:
-        session_id = str(uuid.uuid4())
-        expires_at = (datetime.now() + timedelta(days=7)).isoformat()  # 7 day expiry
+        session_id = secrets.token_hex(16)  # 128-bit opaque token, no UUID version bits
+        expires_at = int(time.time()) + SESSION_TTL_SECONDS
         
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
+            # Deactivate + insert as one write transaction, taking the writer lock up front
+            cursor.execute('BEGIN IMMEDIATE')
+            
             # Deactivate old sessions
             cursor.execute('UPDATE user_sessions SET is_active = 0 WHERE user_id = ?', (user_id,))
+            _forget_user_sessions(user_id)
             
             # Create new session
             cursor.execute('''
@@ -223,8 +359,18 @@ def create_session(user_id: str) -> str:
 
 def verify_session(session_id: str) -> Tuple[bool, Optional[str], Optional[str]]:
     """Verify if session is valid and return user info"""
+    with _session_cache_lock:
+        cached = _session_cache.get(session_id)
+    if cached is not None:
+        user_id, username, expires_at = cached
+        if expires_at >= int(time.time()):
+            return True, user_id, username
+        # Expired - drop it and let the query below deactivate the session
+        with _session_cache_lock:
+            _session_cache.pop(session_id, None)
+    
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -241,12 +387,13 @@ def verify_session(session_id: str) -> Tuple[bool, Optional[str], Optional[str]]
             user_id, username, expires_at = session
             
             # Check if session expired
-            if datetime.fromisoformat(expires_at) < datetime.now():
+            if expires_at < int(time.time()):
                 # Deactivate expired session
                 cursor.execute('UPDATE user_sessions SET is_active = 0 WHERE session_id = ?', (session_id,))
                 conn.commit()
                 return False, None, None
             
+            _cache_session(session_id, user_id, username, expires_at)
             return True, user_id, username
             
     except Exception as e:
@@ -256,39 +403,31 @@ def verify_session(session_id: str) -> Tuple[bool, Optional[str], Optional[str]]
 def get_user_stats(user_id: str) -> dict:
     """Get user generation statistics"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
-            # Get total ideas generated
+            # User info, totals and the last 7 days in one aggregate (covered by idx_stats_user_date)
+            seven_days_ago = int(time.time()) - RECENT_STATS_SECONDS
             cursor.execute('''
-                SELECT SUM(ideas_generated), COUNT(*) as sessions 
-                FROM user_generation_stats 
-                WHERE user_id = ?
-            ''', (user_id,))
+                SELECT u.username, u.email, u.created_at,
+                       COALESCE(SUM(s.ideas_generated), 0),
+                       COUNT(s.id),
+                       COALESCE(SUM(CASE WHEN s.generation_date > ? THEN s.ideas_generated END), 0)
+                FROM auth_users u
+                LEFT JOIN user_generation_stats s ON s.user_id = u.user_id
+                WHERE u.user_id = ?
+                GROUP BY u.user_id
+            ''', (seven_days_ago, user_id))
             
             result = cursor.fetchone()
-            total_ideas = result[0] if result[0] else 0
-            total_sessions = result[1] if result[1] else 0
-            
-            # Get recent activity (last 7 days)
-            seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-            cursor.execute('''
-                SELECT SUM(ideas_generated) 
-                FROM user_generation_stats 
-                WHERE user_id = ? AND generation_date > ?
-            ''', (user_id, seven_days_ago))
-            
-            recent = cursor.fetchone()
-            recent_ideas = recent[0] if recent[0] else 0
-            
-            # Get user info
-            cursor.execute('SELECT username, email, created_at FROM auth_users WHERE user_id = ?', (user_id,))
-            user_info = cursor.fetchone()
+            if not result:
+                result = ('Unknown', 'Unknown', 'Unknown', 0, 0, 0)
+            username, email, member_since, total_ideas, total_sessions, recent_ideas = result
             
             return {
-                'username': user_info[0] if user_info else 'Unknown',
-                'email': user_info[1] if user_info else 'Unknown',
-                'member_since': user_info[2] if user_info else 'Unknown',
+                'username': username,
+                'email': email,
+                'member_since': member_since,
                 'total_ideas': total_ideas,
                 'total_sessions': total_sessions,
                 'recent_ideas': recent_ideas
@@ -308,13 +447,13 @@ def get_user_stats(user_id: str) -> dict:
 def log_generation_activity(user_id: str, ideas_count: int, niches: str, session_id: str = None):
     """Log user generation activity"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 INSERT INTO user_generation_stats (user_id, generation_date, ideas_generated, niches_used, session_id)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, datetime.now().isoformat(), ideas_count, niches, session_id))
+            ''', (user_id, int(time.time()), ideas_count, niches, session_id))
             
             conn.commit()
             
@@ -323,8 +462,10 @@ def log_generation_activity(user_id: str, ideas_count: int, niches: str, session
 
 def logout_user(session_id: str):
     """Logout user by deactivating session"""
+    with _session_cache_lock:
+        _session_cache.pop(session_id, None)
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             cursor.execute('UPDATE user_sessions SET is_active = 0 WHERE session_id = ?', (session_id,))
             conn.commit()